@@ -0,0 +1,73 @@
+import re
+import time
+from threading import Lock
+
+
+def normalize_query(query):
+    # "What's the Weather, today?" and "whats the weather today" are the same question
+    return " ".join(re.sub(r"[^\w\s]", "", query.lower()).split())
+
+
+class AnswerCache:
+
+    def __init__(self, max_entries=1000):
+        self.max_entries = max_entries
+        # key -> [expires_at (epoch seconds, survives restarts), answer]
+        self.entries = {}
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] > time.time():
+                self.metrics["hits"] += 1
+                return entry[1]
+
+            if entry:
+                del self.entries[key]
+            self.metrics["misses"] += 1
+            return None
+
+    def put(self, key, answer, ttl):
+        if ttl <= 0:
+            return
+
+        with self.lock:
+            if key not in self.entries and len(self.entries) >= self.max_entries:
+                self._evict()
+            self.entries[key] = [time.time() + ttl, answer]
+            self.metrics["stores"] += 1
+
+    def _evict(self):
+        now = time.time()
+        expired = [key for key, entry in self.entries.items() if entry[0] <= now]
+        # nothing expired, make room by dropping the answer that expires first
+        for key in (expired or [min(self.entries, key=lambda key: self.entries[key][0])]):
+            del self.entries[key]
+            self.metrics["evictions"] += 1
+
+    def invalidate(self, keyword=""):
+        # forget every answer (or only those with the keyword in the query), returns how many were dropped
+        with self.lock:
+            keys = [key for key in self.entries if normalize_query(keyword) in key]
+            for key in keys:
+                del self.entries[key]
+            self.metrics["invalidations"] += len(keys)
+            return len(keys)
+
+    def get_metrics(self):
+        with self.lock:
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return dict(self.metrics, entries=len(self.entries), hit_rate=(self.metrics["hits"] / lookups if lookups else 0.0))
+
+    def snapshot(self):
+        # for the warm-state snapshot, only what's still valid
+        with self.lock:
+            now = time.time()
+            return {key: entry for key, entry in self.entries.items() if entry[0] > now}
+
+    def restore(self, state):
+        with self.lock:
+            now = time.time()
+            self.entries.update({key: entry for key, entry in state.items() if entry[0] > now})
@@ -0,0 +1,95 @@
+import time
+import sqlite3
+import logging
+from threading import Lock
+from answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# words that don't tell one question from another
+STOP_WORDS = {"a", "an", "the", "is", "are", "was", "were", "what", "whats", "who", "whos", "where", "when", "which", "how",
+              "do", "does", "did", "of", "in", "on", "for", "to", "and", "or", "me", "tell", "about", "please", "can", "you"}
+
+
+def _keywords(query):
+    return [word for word in normalize_query(query).split() if word not in STOP_WORDS]
+
+
+class AnswerStore:
+
+    def __init__(self, db_file, batch_size=20, min_overlap=.6):
+        # every knowledge answer we got, searchable by its question, for when the sources are unreachable
+        self.batch_size = batch_size
+        # share of the question's keywords a stored question must have, so we don't answer something else
+        self.min_overlap = min_overlap
+        self.pending = []
+        self.metrics = {"recorded": 0, "flushes": 0, "searches": 0, "found": 0}
+        self.lock = Lock()
+        self.db_lock = Lock()
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        self.db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS answers USING fts5(question, query, answer, source UNINDEXED, answered_at UNINDEXED)")
+        self.db.commit()
+
+    def record(self, question, answer, source):
+        # queued, written with the next batch (returns True when the batch is full and should be flushed)
+        query = normalize_query(question)
+        if not query or not answer.strip():
+            return False
+
+        with self.lock:
+            self.pending.append((question, query, answer.strip(), source, time.time()))
+            self.metrics["recorded"] += 1
+            return len(self.pending) >= self.batch_size
+
+    def flush(self):
+        with self.lock:
+            pending, self.pending = self.pending, []
+
+        if not pending:
+            return
+
+        with self.db_lock:
+            try:
+                # one transaction per batch, the newest answer to a question replaces the older one
+                with self.db:
+                    self.db.executemany("DELETE FROM answers WHERE query = ?", [(entry[1],) for entry in pending])
+                    self.db.executemany("INSERT INTO answers (question, query, answer, source, answered_at) VALUES (?, ?, ?, ?, ?)", pending)
+                self.metrics["flushes"] += 1
+
+            except sqlite3.Error:
+                logger.exception("Error while writing to the answer store.")
+
+    def search(self, question):
+        # (answer, source, answered_at) of the closest question we have an answer to, or None
+        keywords = _keywords(question)
+        if not keywords:
+            return None
+
+        with self.lock:
+            self.metrics["searches"] += 1
+
+        with self.db_lock:
+            rows = self.db.execute("SELECT query, answer, source, answered_at FROM answers WHERE answers MATCH ? ORDER BY bm25(answers, 1.0, 2.0, 0.5) LIMIT 5",
+                                   (" OR ".join(f'query:"{word}"' for word in keywords),)).fetchall()
+
+        for query, answer, source, answered_at in rows:
+            stored_keywords = set(_keywords(query))
+            # both ways, "who is the president" shouldn't match "who is the president of france"
+            if len(stored_keywords & set(keywords)) >= self.min_overlap * max(len(keywords), len(stored_keywords)):
+                with self.lock:
+                    self.metrics["found"] += 1
+                return answer, source, float(answered_at)
+
+        return None
+
+    def get_metrics(self):
+        with self.db_lock:
+            entries = self.db.execute("SELECT COUNT(*) FROM answers").fetchone()[0]
+
+        with self.lock:
+            return dict(self.metrics, entries=entries, pending=len(self.pending))
+
+    def close(self):
+        self.flush()
+        with self.db_lock:
+            self.db.close()
@@ -5,23 +5,46 @@ import json
 import linecache
 import logging
 from threading import Thread
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError, TimeoutError as FutureTimeout
 from datetime import datetime as dt
 from random import choice, randint
 from colorama import init
-import requests
+from http_client import resolve_url, guarded_call
+from deadline import Deadline
+from datetime import timedelta
+from event_bus import BreakingNews, NotificationToggle, Shutdown
+from lifecycle import RestartAssistant
+from snapshot import Snapshot
+from metrics import write_metrics
+from settings import Configuration
+from session import current_session, bind_session
+from scheduler import Scheduler, hourly_at, daily_at, every, CATCH_UP_ONCE, CATCH_UP_SKIP
+from task_pool import run_in_background
 from helper import is_match, is_match_and_bare, get_commands, clean_voice_data, extract_metadata, execute_map, check_connection
 from tts import SpeechAssistant
-from skills_library import SkillsLibrary
+from skills_library import SkillsLibrary, daily_memo, restore_daily_memo, wolfram_cache, wolfram_quota, answer_store
+
+config = Configuration()
+
+# sections of "what's happening today", in the order they're said
+BRIEFING_ORDER = ["date", "breaking news", "latest news", "this day in history", "fun holiday", "weather", "sunrise sunset"]
+# one pool for every briefing (the morning one and the asked for ones), a briefing task never waits on another one
+briefing_executor = ThreadPoolExecutor(max_workers=config.BRIEFING_WORKERS, thread_name_prefix="briefing")
 
 
 class VirtualAssistant(SpeechAssistant):
 
-    def __init__(self, masters_name, assistants_name, listen_timeout=3):
-        super().__init__(masters_name, assistants_name)
+    def __init__(self, masters_name, assistants_name, listen_timeout=3, warm=None, headless=False):
+        # runs the timed jobs (announcements, notifications, restart),
+        # created first since the bot command handler (started by SpeechAssistant) uses it
+        self.scheduler = Scheduler()
+        super().__init__(masters_name, assistants_name, warm, headless)
         self.master_name = masters_name
         self.assistant_name = assistants_name
         self.listen_timeout = listen_timeout
         self.breaking_news_reported = []
+        # briefing sections built ahead of time, name -> (items, expires epoch)
+        self.prepared_briefing = {}
         self.is_online = False
         self.notification = True
 
@@ -30,11 +53,25 @@ class VirtualAssistant(SpeechAssistant):
         self.news = None
         logger = logging.getLogger(__name__)
 
+        # what we learned before the last restart, loaded once per process
+        if self.warm.snapshot is None:
+            self.warm.snapshot = Snapshot(os.path.join(self.ASSISTANT_DIR, self.SNAPSHOT_FILE))
+        self.snapshot = self.warm.snapshot
+        self.snapshot.register("breaking_news_reported", lambda: self.breaking_news_reported, self._restore_breaking_news_reported)
+        self.snapshot.register("daily_memo", lambda: daily_memo, restore_daily_memo)
+        self.snapshot.register("wolfram_cache", wolfram_cache.snapshot, wolfram_cache.restore)
+        self.snapshot.register("wolfram_quota", wolfram_quota.snapshot, wolfram_quota.restore)
+
     def print(self, message):
-        print(message)
+        # text sessions get their messages in the response, don't flood the console with them
+        if not current_session():
+            print(message)
         self.respond_to_bot(message)
 
     def maximize_command_interface(self, maximize=True):
+        if self.headless:
+            return
+
         if maximize:
             os.system(
                 "CMDOW @ /ren \"Virtual Assistant - Brenda\" /MOV 900 400 /siz 491 336 /TOP")
@@ -44,30 +81,48 @@ class VirtualAssistant(SpeechAssistant):
 
     def restart(self):
         self.print("\n Comencing restart...")
-        time.sleep(3)
-        # make sure we're in the correct directory of batch file to execute
-        os.chdir(self.ASSISTANT_DIR)
-        AUDIO_FOLDER = "./text-to-speech-audio"
+        AUDIO_FOLDER = os.path.join(self.ASSISTANT_DIR, self.AUDIO_FOLDER)
 
         print(" Cleaning up...")
-        for aud_file in os.listdir(AUDIO_FOLDER):
-            if "prompt.mp3" not in aud_file:
-                audio_file = f"{AUDIO_FOLDER}/{aud_file}"
-                # delete the audio file after announcing to save mem space
-                os.remove(audio_file)
+        if os.path.isdir(AUDIO_FOLDER):
+            for aud_file in os.listdir(AUDIO_FOLDER):
+                audio_file = os.path.join(AUDIO_FOLDER, aud_file)
+                # the prepared briefing audio (its own folder) is kept, prepare_speech() replaces it
+                if "prompt.mp3" not in aud_file and os.path.isfile(audio_file):
+                    # delete the audio file after announcing to save mem space
+                    os.remove(audio_file)
 
         print(" Initiating new instance...")
-        # execute batch file that will open a new instance of virtual assistant
-        os.system(f'start cmd /k "start_brenda.bat"')
-
-        self.print(" Done!")
-        time.sleep(3)
-        sys.exit()
-        exit()
+        # unwind to the supervisor (main.py), it restarts us in this process
+        # with the bot, http pools and news scraper still warm
+        raise RestartAssistant()
+
+    def _restore_breaking_news_reported(self, state):
+        # so we don't announce the same breaking news again after restart
+        self.breaking_news_reported = list(state)
+
+    def shutdown(self):
+        # called by the supervisor before the next instance is created
+        self.scheduler.stop()
+        self.snapshot.save()
+        answer_store.flush()
+        # stops the breaking news notifier of this instance
+        self.events.publish(Shutdown())
+        super().shutdown()
 
     def deactivate(self, voice_data):
+        session = current_session()
+        if session:
+            # a text session can only end itself, not the assistant
+            if is_match(voice_data, self._get_commands("terminate")):
+                self.speak(choice(self._get_commands("terminate_response")))
+                session.end()
+                return True
+            return False
+
         # commands to terminate virtual assistant
-        if is_match(voice_data, self._get_commands("terminate")) or self.restart_request:
+        restart_requested = self.restart_requested()
+        if is_match(voice_data, self._get_commands("terminate")) or restart_requested:
             if self.isSleeping() and voice_data:
                 self.print(
                     f"{self.BLACK_GREEN}{self.master_name}:{self.GREEN} {voice_data}")
@@ -76,9 +131,8 @@ class VirtualAssistant(SpeechAssistant):
             self.speak("<end prompt>", end_prompt=True)
             self.sleep(False)
 
-            if "restart" in voice_data or self.restart_request:
+            if "restart" in voice_data or restart_requested:
                 self.restart()
-                self.restart_request = False
 
             else:
                 self.speak(choice(self._get_commands("terminate_response")))
@@ -110,7 +164,8 @@ class VirtualAssistant(SpeechAssistant):
 
             self.sleep(True)
             # volume up the music player, if applicable
-            self.skills.music_volume(70)
+            if not current_session():
+                self.skills.music_volume(70)
             return True
 
         return False
@@ -155,11 +210,51 @@ class VirtualAssistant(SpeechAssistant):
         else:
             self.print(" (Notification is Off)")
         self.notification = value
+        self.events.publish(NotificationToggle(value))
 
     def _get_commands(self, command_name):
         return get_commands(command_name, self.assistant_name, self.master_name)
 
-    def activate(self):
+    def _request_restart(self):
+        # wait until she's sleeping, so we don't restart in the middle of a conversation
+        if self.isSleeping():
+            self.scheduler.cancel("restart")
+            # log and send the restart request message to telegram bot
+            message = "Restart requested to re-authenticate Telegram bot..."
+            self.print(message)
+            # the listen loop picks up the request and restarts the application
+            self.request_restart(message)
+
+    def schedule_restart(self):
+        # restart the application after 6 hours of bot inactivity to re-authenticate Telegram bot,
+        # not needed in webhook mode since Telegram pushes the updates to us
+        if not self.webhook:
+            self.scheduler.add_job("restart", self._request_restart, every(60), first_run=(dt.now() + timedelta(hours=6)))
+
+    def on_bot_command(self, command):
+        # the bot is alive, push back the scheduled restart
+        self.schedule_restart()
+
+        # Enable/Disable Notifications
+        if "/disable notification" in command:
+            self.toggle_notification(False)
+            return True
+
+        elif "/enable notification" in command:
+            self.toggle_notification(True)
+            return True
+
+        return False
+
+    def fetch_news(self):
+        try:
+            # skip fetching while the news sources keep failing, and use the news we already have
+            guarded_call("news", self.news.fetch_news, failure_types=(Exception,))
+
+        except Exception:
+            self.Log("News sources are unreachable, using the last fetched news.", logging.WARNING)
+
+    def build_routes(self):
         def _awake_greetings(start_prompt=True):
             self.speak(choice(self._get_commands("wakeup_responses")),
                        start_prompt=start_prompt)
@@ -206,6 +301,8 @@ class VirtualAssistant(SpeechAssistant):
             return False
 
         def _formulate_responses(voice_data):
+            # time budget for answering this utterance, passed into every skill and http call
+            deadline = Deadline(self.RESPONSE_BUDGET)
             response_message = ""
             ask_google = True
             ask_wikipedia = True
@@ -223,9 +320,9 @@ class VirtualAssistant(SpeechAssistant):
                 if self.mute_assistant(voice_data):
                     return
 
-                # respond to deactivation commands
+                # respond to deactivation commands (only a text session gets here, the others exit)
                 if self.deactivate(voice_data):
-                    sys.exit()
+                    return
 
                 # night mode
                 if is_match(voice_data, self._get_commands("night mode")):
@@ -237,6 +334,13 @@ class VirtualAssistant(SpeechAssistant):
                     self.day_mode()
                     return
 
+                # forget the cached answers, all of them or only about a topic ("clear cache for weather")
+                clear_cache_commands = self._get_commands("clear cache")
+                if is_match(voice_data, clear_cache_commands):
+                    topic = extract_metadata(voice_data, (clear_cache_commands + ["for", "about", "on"]))
+                    self.speak(self.skills.clear_answer_cache(topic))
+                    return
+
                 # commands for greeting
                 greeting_commands = self._get_commands("greeting")
                 if is_match(voice_data, greeting_commands):
@@ -447,7 +551,7 @@ class VirtualAssistant(SpeechAssistant):
                     self.print("\n Fetching information from news channels...\n")
 
                     # get news information from sources
-                    self.news.fetch_news()
+                    self.fetch_news()
 
                     # get meta data to use for news headline search
                     news_meta_data = extract_metadata(voice_data, (news_commands + preposition_words))
@@ -456,7 +560,7 @@ class VirtualAssistant(SpeechAssistant):
                     # breaking news report
                     if is_match(voice_data, ["breaking news"]):
                         # if news.check_breaking_news() and self.can_listen:
-                        news_response = _breaking_news_report(on_demand=True)
+                        news_response = _breaking_news_report(on_demand=True, deadline=deadline)
                         if len(news_response) <= 0:
                             self.speak("Sorry, no Breaking News available (at the moment).")
                             return True
@@ -481,13 +585,11 @@ class VirtualAssistant(SpeechAssistant):
                                 self.speak(f"Here are your latest news briefing{about}.")
                                 for i in range(0, number_of_results):
                                     # let's get the redirected url (if possible) from link we have
-                                    redirect_url = requests.get(news_briefing[i]["source url"])
+                                    redirect_url = resolve_url(news_briefing[i]["source url"], deadline=deadline)
                                     # open the source article in webbrowser.
-                                    open_news_url_thread = Thread(target=execute_map, args=("open browser", [redirect_url.url],))
-                                    open_news_url_thread.setDaemon(True)
-                                    open_news_url_thread.start()
+                                    execute_map("open browser", [redirect_url])
                                     # send the link to bot
-                                    self.respond_to_bot(redirect_url.url)
+                                    self.respond_to_bot(redirect_url)
                                     self.speak(f"{news_briefing[i]['report']}")
 
                         # top 1 latest news report
@@ -499,13 +601,11 @@ class VirtualAssistant(SpeechAssistant):
                                 top_news = news_deets[0]
                                 self.speak(f"Here's the latest news{about}.")
                                 # let's get the redirected url (if possible) from link we have
-                                redirect_url = requests.get(top_news["source url"])
+                                redirect_url = resolve_url(top_news["source url"], deadline=deadline)
                                 # open the source article in webbrowser.
-                                open_news_url_thread = Thread(target=execute_map, args=("open browser", [redirect_url.url],))
-                                open_news_url_thread.setDaemon(True)
-                                open_news_url_thread.start()
+                                execute_map("open browser", [redirect_url])
                                 # send the link to bot
-                                self.respond_to_bot(redirect_url.url)
+                                self.respond_to_bot(redirect_url)
                                 self.speak(f"{top_news['report']}")
 
                         # random news report for today
@@ -519,13 +619,11 @@ class VirtualAssistant(SpeechAssistant):
                                 # choose random news from list of latest news today
                                 random_news_today = choice(latest_news)
                                 # let's get the redirected url (if possible) from link we have
-                                redirect_url = requests.get(random_news_today["source url"])
+                                redirect_url = resolve_url(random_news_today["source url"], deadline=deadline)
                                 # open the source article in webbrowser.
-                                open_news_url_thread = Thread(target=execute_map, args=("open browser", [redirect_url.url],))
-                                open_news_url_thread.setDaemon(True)
-                                open_news_url_thread.start()
+                                execute_map("open browser", [redirect_url])
                                 # send the link to bot
-                                self.respond_to_bot(redirect_url.url)
+                                self.respond_to_bot(redirect_url)
                                 self.speak(f"{random_news_today['report']}")
 
                         if news_found:
@@ -562,7 +660,7 @@ class VirtualAssistant(SpeechAssistant):
                         voice_data, google_maps_commands)
 
                     if location:
-                        response_message += self.skills.google_maps(location)
+                        response_message += self.skills.google_maps(location, deadline)
                         # don't search on google we found answers from maps
                         ask_wolfram = False
                         ask_wikipedia = False
@@ -575,11 +673,17 @@ class VirtualAssistant(SpeechAssistant):
                 # try wolfram for answers
                 if ask_wolfram and not any(word for word in voice_data.split() if word in confirmation_commands):
                     # using commands from google to extract useful meta data for wolfram search
-                    wolfram_response = self.skills.wolfram_search(voice_data)
-                    # fun holiday information from timeanddate.com
-                    title, message, did_you_know = self.skills.fun_holiday()
-                    if wolfram_response and message and "today is" in wolfram_response:
-                        wolfram_response += f"\n\nAccording to TimeAndDate.com, {message}\n{did_you_know}"
+                    with deadline.track("wolfram_search"):
+                        wolfram_response = self.skills.wolfram_search(voice_data, deadline)
+                    if wolfram_response:
+                        self.skills.remember_answer(voice_data, wolfram_response, "Wolfram|Alpha")
+
+                    # fun holiday information from timeanddate.com, only when asked what day it is
+                    if wolfram_response and "today is" in wolfram_response and deadline.allows("fun_holiday"):
+                        with deadline.track("fun_holiday"):
+                            title, message, did_you_know = self.skills.fun_holiday(cached_only=True)
+                        if message:
+                            wolfram_response += f"\n\nAccording to TimeAndDate.com, {message}\n{did_you_know}"
 
                     if wolfram_response:
                         response_message += wolfram_response
@@ -593,8 +697,9 @@ class VirtualAssistant(SpeechAssistant):
                     # extract the keyword
                     wiki_keyword = extract_metadata(voice_data, wiki_commands)
                     # get aswers from wikipedia
-                    wiki_result = self.skills.wikipedia_search(
-                        wiki_keyword=wiki_keyword, voice_data=voice_data)
+                    with deadline.track("wikipedia_search"):
+                        wiki_result = self.skills.wikipedia_search(
+                            wiki_keyword=wiki_keyword, voice_data=voice_data, deadline=deadline)
 
                     keyword_list = wiki_keyword.lower().split(" ")
                     # if answer from wikipedia contains more than 2 words
@@ -624,7 +729,7 @@ class VirtualAssistant(SpeechAssistant):
 
                     # search on google if we have a keyword
                     if google_keyword:
-                        response_message += self.skills.google(google_keyword)
+                        response_message += self.skills.google(google_keyword, deadline)
                         not_confirmation = False
 
                 if not_confirmation and is_match(voice_data, confirmation_commands):
@@ -641,8 +746,16 @@ class VirtualAssistant(SpeechAssistant):
                         # we don't need further contextual answers
                         return
 
+                # the sources are down or too slow, answer what we were told before (if we were asked before)
+                if not response_message and (deadline.expired() or self.skills.sources_unreachable()):
+                    response_message = self.skills.recall_answer(voice_data)
+
                 # we did not found any response
-                if not response_message:
+                if not response_message and deadline.expired():
+                    # the sources took too long, say so instead of pretending we don't know
+                    response_message = "Sorry, my sources are taking too long to answer. Please try again in a while."
+
+                elif not response_message:
                     # set the unknown response
                     response_message = choice(self._get_commands("unknown_responses"))
 
@@ -659,63 +772,216 @@ class VirtualAssistant(SpeechAssistant):
                 self.Log("Error forumulating response.")
                 self.respond_to_bot("Error forumulating response.")
 
-        def _happening_today():
-            # get updates from news channels
-            self.news.fetch_news()
-
-            # Today's date and time
-            date_today_response_from_wolfram = self.skills.wolfram_search("what day is it?")
-            response_time = self.skills.ask_time("what time is it?")
-            if date_today_response_from_wolfram and response_time:
-                self.speak(f"{date_today_response_from_wolfram} {response_time}")
-
-            self.speak("Here's what's happening today.")
-
-            # breaking news, if there's any
-            breaking_news_response = _breaking_news_report(on_demand=True)
-            if breaking_news_response:
-                self.speak(breaking_news_response.replace("Here's the ", ""))
-
-            # top latest news today
-            news_briefing = self.news.cast_latest_news()
-            number_of_results = len(news_briefing)
-            if number_of_results > 0:
-                if number_of_results > 2:
-                    number_of_results = 3
-
-                self.speak(f"Here are the latest news today:")
-                for i in range(0, number_of_results):
-                    # let's get the redirected url (if possible) from link we have
-                    redirect_url = requests.get(news_briefing[i]["source url"])
-                    # open the source article in webbrowser.
-                    open_news_url_thread = Thread(target=execute_map, args=("open browser", [redirect_url.url],))
-                    open_news_url_thread.setDaemon(True)
-                    open_news_url_thread.start()
+        def _briefing_sections(deadline, fetch, after, names):
+            # name -> (collect, when the section goes stale), for the sections asked for. collect() waits for the section's items,
+            # it's only called by the thread saying (or preparing) the briefing, never by a briefing task.
+            # items are what the briefing does in order: ("say", text), ("time",), ("open", urls), ("link", url), ("reported", headlines)
+            midnight = dt.combine(dt.now().date() + timedelta(days=1), dt.min.time()).timestamp()
+            news_expires = time.time() + self.BRIEFING_NEWS_TTL
+            weather_expires = time.time() + self.BRIEFING_WEATHER_TTL
+            sections = {}
+
+            def _collect(future):
+                return lambda: future.result(timeout=deadline.remaining())
+
+            if names & {"breaking news", "latest news"}:
+                # get updates from news channels, the news sections start when it's done
+                news_fetched = fetch(self.fetch_news)
+
+            def _date_today(date_today):
+                return [("say", date_today), ("time",)] if date_today else []
+
+            def _breaking_news(_):
+                # nothing is marked as reported until it's actually said
+                response, source_urls, redirect_urls, headlines = _collect_breaking_news(on_demand=True, deadline=deadline, mark_reported=False)
+                items = [("reported", headlines), ("open", source_urls)] + [("link", redirect_url) for redirect_url in redirect_urls]
+                return items + [("say", response.replace("Here's the ", ""))] if response else items
+
+            def _latest_news():
+                # top 3 latest news today, with their redirected urls (if possible) resolved at the same time
+                latest_news = after(news_fetched, lambda _: self.news.cast_latest_news()[:3])
+                redirect_urls = [after(latest_news, lambda news, index: resolve_url(news[index]["source url"], deadline) if index < len(news) else None, index)
+                                 for index in range(3)]
+
+                def _collect_latest_news():
+                    news_briefing = latest_news.result(timeout=deadline.remaining())
+                    items = [("say", "Here are the latest news today:")] if news_briefing else []
+                    for news, redirect_url in zip(news_briefing, redirect_urls):
+                        redirect_url = redirect_url.result(timeout=deadline.remaining())
+                        if redirect_url:
+                            items += [("open", [redirect_url]), ("link", redirect_url)]
+                        items.append(("say", news["report"]))
+                    return items
+                return _collect_latest_news
+
+            def _this_day_in_history():
+                # what happend today in history from Wolfram|Alpha
+                response_from_wolfram = self.skills.wolfram_search("this day in history", deadline)
+                return [("say", "From this day in history."), ("say", response_from_wolfram)] if response_from_wolfram else []
+
+            def _fun_holiday():
+                # fun holiday information from timeanddate.com
+                title, fun_holiday_info, did_you_know = self.skills.fun_holiday() if deadline.allows("fun_holiday") else ("", "", "")
+                return [("say", f"From timeanddate.com, {title}\n{fun_holiday_info}\n{did_you_know}")] if fun_holiday_info else []
+
+            def _weather():
+                # what's weather forecast today from Wolfram|Alpha
+                weather_response_from_wolfram = self.skills.wolfram_search("what's the weather like?", deadline)
+                return [("say", weather_response_from_wolfram)] if weather_response_from_wolfram else []
+
+            def _sunrise_sunset():
+                # sunrise/sunset forecast today from Wolfram|Alpha, asked at the same time
+                sunrise = fetch(self.skills.wolfram_search, "when is the sunrise?", deadline)
+                sunset = fetch(self.skills.wolfram_search, "when is the sunset?", deadline)
+
+                def _collect_sunrise_sunset():
+                    sunrise_response_from_wolfram = sunrise.result(timeout=deadline.remaining()).split("(")[0]
+                    sunset_response_from_wolfram = sunset.result(timeout=deadline.remaining()).split("(")[0]
+                    return [("say", f"{sunrise_response_from_wolfram} and {sunset_response_from_wolfram}")] if sunrise_response_from_wolfram and sunset_response_from_wolfram else []
+                return _collect_sunrise_sunset
+
+            if "date" in names:
+                sections["date"] = (_collect(fetch(lambda: _date_today(self.skills.wolfram_search("what day is it?", deadline)))), midnight)
+            if "breaking news" in names:
+                sections["breaking news"] = (_collect(after(news_fetched, _breaking_news)), news_expires)
+            if "latest news" in names:
+                sections["latest news"] = (_latest_news(), news_expires)
+            if "this day in history" in names:
+                sections["this day in history"] = (_collect(fetch(_this_day_in_history)), midnight)
+            if "fun holiday" in names:
+                sections["fun holiday"] = (_collect(fetch(_fun_holiday)), midnight)
+            if "weather" in names:
+                sections["weather"] = (_collect(fetch(_weather)), weather_expires)
+            if "sunrise sunset" in names:
+                sections["sunrise sunset"] = (_sunrise_sunset(), midnight)
+
+            return sections
+
+        def _briefing_fetcher(submitted):
+            # (fetch, after) on the shared briefing pool, what they submit is kept in submitted so the briefing can cancel it
+            def _fetch(func, *args):
+                future = briefing_executor.submit(bind_session(func), *args)
+                submitted.append(future)
+                return future
+
+            def _after(future, func, *args):
+                # func(future's result, *args) is submitted when future is done, instead of a briefing task waiting for it
+                func = bind_session(func)
+                chained = Future()
+                submitted.append(chained)
+
+                def _copy(done):
+                    if done.cancelled():
+                        chained.set_exception(CancelledError())
+                    elif done.exception() is not None:
+                        chained.set_exception(done.exception())
+                    else:
+                        chained.set_result(done.result())
+
+                def _submit(done):
+                    if not chained.set_running_or_notify_cancel():
+                        # the briefing is over
+                        return
+                    if done.cancelled() or done.exception() is not None:
+                        return _copy(done)
+
+                    try:
+                        started = briefing_executor.submit(func, done.result(), *args)
+                    except RuntimeError as ex:
+                        # shutting down
+                        return chained.set_exception(ex)
+
+                    submitted.append(started)
+                    started.add_done_callback(_copy)
+
+                future.add_done_callback(_submit)
+                return chained
+
+            return _fetch, _after
+
+        def _precompute_briefing():
+            # build the briefing in the morning, before anyone asks for it
+            if not (self.BRIEFING_PRECOMPUTE_FROM <= dt.now().hour < self.BRIEFING_PRECOMPUTE_UNTIL):
+                return
+
+            deadline = Deadline(self.BRIEFING_BUDGET)
+            submitted = []
+            prepared_briefing = {}
+
+            try:
+                sections = _briefing_sections(deadline, *_briefing_fetcher(submitted), set(BRIEFING_ORDER))
+
+                for name, (collect, expires) in sections.items():
+                    try:
+                        prepared_briefing[name] = (collect(), expires)
+
+                    except FutureTimeout:
+                        # asked again in the next run, or fetched when the briefing is asked for
+                        pass
+
+                    except Exception:
+                        self.Log(f"Error while preparing the \"{name}\" briefing.")
+
+            finally:
+                # what hasn't started yet is asked again in the next run
+                for future in submitted:
+                    future.cancel()
+
+            self.prepared_briefing = prepared_briefing
+            if not self.headless:
+                # and its audio, the briefing starts playing without waiting for google
+                self.prepare_speech([item[1] for items, _ in prepared_briefing.values() for item in items if item[0] == "say"]
+                                    + ["Here's what's happening today."])
+
+        def _play_briefing(items):
+            for item in items:
+                if item[0] == "say":
+                    self.speak(item[1])
+                elif item[0] == "time":
+                    self.speak(self.skills.ask_time("what time is it?"))
+                elif item[0] == "open" and item[1]:
+                    # open the source articles in webbrowser.
+                    execute_map("open browser", item[1])
+                elif item[0] == "link":
                     # send the link to bot
-                    self.respond_to_bot(redirect_url.url)
-                    self.speak(f"{news_briefing[i]['report']}")
-
-            # what happend today in history from Wolfram|Alpha
-            response_from_wolfram = self.skills.wolfram_search("this day in history")
-            if response_from_wolfram:
-                self.speak("From this day in history.")
-                self.speak(response_from_wolfram)
-
-            # fun holiday information from timeanddate.com
-            title, fun_holiday_info, did_you_know = self.skills.fun_holiday()
-            if fun_holiday_info:
-                self.speak(f"From timeanddate.com, {title}\n{fun_holiday_info}\n{did_you_know}")
-
-            # what's weather forecast today from Wolfram|Alpha
-            weather_response_from_wolfram = self.skills.wolfram_search("what's the weather like?")
-            if weather_response_from_wolfram:
-                self.speak(weather_response_from_wolfram)
-
-            # sunrise/sunset forecast today from Wolfram|Alpha
-            sunrise_response_from_wolfram = self.skills.wolfram_search("when is the sunrise?").split("(")[0]
-            sunset_response_from_wolfram = self.skills.wolfram_search("when is the sunset?").split("(")[0]
-            if sunrise_response_from_wolfram and sunset_response_from_wolfram:
-                self.speak(f"{sunrise_response_from_wolfram} and {sunset_response_from_wolfram}")
+                    self.respond_to_bot(item[1])
+                elif item[0] == "reported" and item[1]:
+                    self.breaking_news_reported = list(item[1])
+
+        def _happening_today():
+            # the briefing has a bigger budget than a single answer, sections are skipped once it's spent
+            deadline = Deadline(self.BRIEFING_BUDGET)
+            # the sections prepared in the morning are said right away while they're still fresh,
+            # the others are all fetched at the same time and said in order as soon as they're ready
+            prepared_briefing = self.prepared_briefing
+            fresh = {name for name, (_, expires) in prepared_briefing.items() if expires > time.time()}
+            submitted = []
+
+            try:
+                sections = _briefing_sections(deadline, *_briefing_fetcher(submitted), set(BRIEFING_ORDER) - fresh)
+
+                for name in BRIEFING_ORDER:
+                    if name in fresh:
+                        _play_briefing(prepared_briefing[name][0])
+
+                    else:
+                        try:
+                            _play_briefing(sections[name][0]())
+
+                        except FutureTimeout:
+                            # it's too late for this section
+                            pass
+
+                        except Exception:
+                            self.Log("Error while preparing the daily briefing.")
+
+                    if name == "date":
+                        self.speak("Here's what's happening today.")
+
+            finally:
+                # don't start a section that ran out of time, it won't be said anyway
+                for future in submitted:
+                    future.cancel()
 
             if dt.now().hour <= 10:
                 music_response = self.skills.play_music(choice(["post malone", "bazzi"]))
@@ -724,82 +990,95 @@ class VirtualAssistant(SpeechAssistant):
                     # mute and sleep assistant when playing music
                     self.sleep(True)
 
-        def _heart_beat():
-            start_time = dt.now()
-            time_ticker = 0
+        def _announce_time():
+            # announce the hourly time
+            if self.isSleeping():
+                self.speak(f"The time now is {dt.now().strftime('%I:%M %p')}.")
 
-            while True:
-                current_time = dt.now()
-                hr = current_time.hour
-                mn = current_time.minute
-                sec = current_time.second
-
-                total_time = current_time - start_time
-                active_hours = int((total_time.days * 24) + (total_time.seconds // 3600))
-
-                # restart the application every 8 hours to re-authenticate Telegram bot
-                if self.isSleeping() and active_hours >= 6 and sec == 30:
-                    self.restart_request = True
-                    # log and send the restart request message to telegram bot
-                    message = "Restart requested to re-authenticate Telegram bot..."
-                    self.print(message)
-                    self.deactivate()
-                    break
-
-                # announce the hourly time
-                if time_ticker == 0 and (mn == 0 and sec == 0) and self.isSleeping():
-                    self.speak(f"The time now is {current_time.strftime('%I:%M %p')}.")
-                    time_ticker += 1
-
-                    if self.isSleeping():
-                        time.sleep(1)
-                        # put back to normal volume level
-                        self.skills.music_volume(70)
-
-                # send "Fun Holiday" notification every 10:00:30 AM
-                if self.notification and time_ticker == 0 and ((hr == 10) and mn == 00 and sec == 30):
-                    title, message, _ = self.skills.fun_holiday()
+                if self.isSleeping():
+                    time.sleep(1)
+                    # put back to normal volume level
+                    self.skills.music_volume(70)
+
+        def _fun_holiday_notification():
+            # send "Fun Holiday" notification
+            if self.notification:
+                title, message, _ = self.skills.fun_holiday()
+                if message:
                     self.skills.toast_notification(title, message)
 
-                # Enable/Disable Notifications
-                if self.bot_command:
-                    # get the baseline time when to request for a restart for Telegram bot re-authentication
-                    start_time = dt.now()
-
-                    if "/disable notification" in self.bot_command:
-                        self.toggle_notification(False)
-                        self.bot.last_command = None
-
-                    elif "/enable notification" in self.bot_command:
-                        self.toggle_notification(True)
-                        self.bot.last_command = None
-
-                # Restart request
-                if self.restart_request:
-                    self.bot_command = f"restart {self.assistant_name}"
+        def _prefetch_fun_holiday():
+            # today's fun holiday, fetched once and written to disk right away
+            title, message, _ = self.skills.fun_holiday()
+            if message:
+                self.snapshot.save()
+
+        def _prefetch_wikipedia():
+            # the people, places and organizations in the news are likely to be asked about
+            headlines = [bn["headline"] for bn in self.news.breaking_news_update] + [news["report"] for news in self.news.cast_latest_news()]
+            self.skills.prefetch_wikipedia(headlines)
+
+        def _schedule_jobs():
+            # a stale time announcement is worse than none, skip it if it's more than a minute late
+            self.scheduler.add_job("announce time", _announce_time, hourly_at(0, 0), catch_up=CATCH_UP_SKIP)
+            # every 10:00:30 AM, and later in the day if the assistant wasn't running at that time
+            self.scheduler.add_job("fun holiday", _fun_holiday_notification, daily_at(10, 0, 30), catch_up=CATCH_UP_ONCE, misfire_grace=(12 * 3600))
+            # shortly after midnight (and on start up, unless the snapshot already has today's), so no question waits for the scraper.
+            # in the background, the other jobs don't wait for it either
+            self.scheduler.add_job("prefetch fun holiday", lambda: run_in_background("prefetch fun holiday", _prefetch_fun_holiday),
+                                   daily_at(0, 5, 0), first_run=dt.now(), catch_up=CATCH_UP_ONCE, misfire_grace=(12 * 3600))
+            self.schedule_restart()
+            # check for new breaking news every minute (60 sec)
+            self.scheduler.add_job("breaking news", _check_breaking_news, every(60), first_run=dt.now(), catch_up=CATCH_UP_SKIP)
+            # a crash between restarts only loses the last few minutes of warm state
+            self.scheduler.add_job("snapshot", self.snapshot.save, every(self.SNAPSHOT_INTERVAL), catch_up=CATCH_UP_SKIP)
+            # the metrics of every component, for anyone who wants to look (or graph them)
+            metrics_file = os.path.join(self.ASSISTANT_DIR, self.METRICS_FILE)
+            self.scheduler.add_job("metrics", lambda: write_metrics(metrics_file), every(self.METRICS_INTERVAL), catch_up=CATCH_UP_SKIP)
+            # the answers not written yet, when there were too few for a full batch
+            self.scheduler.add_job("answer store", answer_store.flush, every(self.ANSWER_STORE_FLUSH_INTERVAL), catch_up=CATCH_UP_SKIP)
+            # the morning briefing is ready before it's asked for (only builds within the morning hours),
+            # in the background so it doesn't hold up the time announcement and the breaking news
+            self.scheduler.add_job("prepare briefing", lambda: run_in_background("prepare briefing", _precompute_briefing),
+                                   every(self.BRIEFING_PRECOMPUTE_INTERVAL), first_run=dt.now(), catch_up=CATCH_UP_SKIP)
+            if self.WIKIPEDIA_PREFETCH:
+                # in the background, a slow wikipedia shouldn't hold up the other jobs
+                self.scheduler.add_job("wikipedia prefetch", lambda: run_in_background("wikipedia prefetch", _prefetch_wikipedia),
+                                       every(self.WIKIPEDIA_PREFETCH_INTERVAL), catch_up=CATCH_UP_SKIP)
+
+        def _breaking_news_report(on_demand=False, deadline=None):
+            response, source_urls, redirect_urls, _ = _collect_breaking_news(on_demand, deadline)
+            _share_news_links(source_urls, redirect_urls)
+            return response
 
-                if time_ticker >= 1:
-                    time_ticker = 0
+        def _share_news_links(source_urls, redirect_urls):
+            if len(source_urls) > 0:
+                # open the source articles in webbrowser
+                execute_map("open browser", source_urls)
 
-                time.sleep(1)
+            for redirect_url in redirect_urls:
+                # send the link to bot
+                self.respond_to_bot(redirect_url)
 
-        def _breaking_news_report(on_demand=False):
+        def _collect_breaking_news(on_demand=False, deadline=None, mark_reported=True):
+            # the report and its links, without announcing anything (the briefing fetches it in the background)
             response = ""
             source_urls = []
+            redirect_urls = []
+            news_briefing = []
 
             try:
                 if self.news.check_breaking_news() or on_demand:
                     new_breaking_news = False
                     breaking_news_update = self.news.breaking_news_update
 
-                    news_briefing = []
                     for bn in breaking_news_update:
                         if not any(bn["headline"].lower() in breaking_news.lower() for breaking_news in self.breaking_news_reported):
                             news_briefing.append(bn["headline"])
                             new_breaking_news = True
 
                     if new_breaking_news or on_demand:
-                        if len(news_briefing) > 0:
+                        if len(news_briefing) > 0 and mark_reported:
                             self.breaking_news_reported = []
                             self.breaking_news_reported.extend(news_briefing)
 
@@ -816,57 +1095,64 @@ class VirtualAssistant(SpeechAssistant):
 
                         if len(source_urls) > 0:
                             # convert the list of source_urls to set to remove duplicate.
-                            open_news_url_thread = Thread(target=execute_map, args=("open browser", set(source_urls),))
-                            open_news_url_thread.setDaemon(True)
-                            open_news_url_thread.start()
+                            source_urls = list(set(source_urls))
 
-                            for link in set(source_urls):
+                            for link in source_urls:
                                 # let get the redirected url (if possible) from link we have
-                                redirect_url = requests.get(link)
-                                # send the link to bot
-                                self.respond_to_bot(redirect_url.url)
+                                redirect_urls.append(resolve_url(link, deadline=deadline))
 
-                        if len(source_urls) > 0:
                             response += "More details of this breaking news in the source article. It should open in your web browser now..."
 
             except Exception:
                 pass
                 self.Log("Error while reading the breaking news report.")
 
-            return response
+            return response, source_urls, redirect_urls, news_briefing
 
-        def _breaking_news_notification(timeout=60):
-            timeout_counter = 0
+        def _check_breaking_news():
+            # let the notifier know about the breaking news we haven't reported yet
+            if self.news.check_breaking_news():
+                headlines = [bn["headline"] for bn in self.news.breaking_news_update
+                             if not any(bn["headline"].lower() in breaking_news.lower() for breaking_news in self.breaking_news_reported)]
 
-            try:
-                while True:
-                    if timeout_counter == 0 or timeout_counter >= timeout:
-                        if self.news.check_breaking_news() and self.notification:
-                            timeout_counter = 1
-
-                            news_briefing = []
-                            headlines = ""
-                            for bn in self.news.breaking_news_update:
-                                headline = bn["headline"]
-                                if not any(headline.lower() in breaking_news.lower() for breaking_news in self.breaking_news_reported):
-                                    news_briefing.append(bn["headline"])
-                                    headlines += f">> {headline}\n\n"
-
-                            if len(news_briefing) > 0:
-                                if len(headlines) > 255:
-                                    # use the firts headline if the whole news is > 255 chars
-                                    headlines = f">> {news_briefing[0]} ..more"
-                                    if len(headlines) > 255:
-                                        headlines = f">> {news_briefing[0][:240]}...more"
-
-                                self.skills.toast_notification("* * * BREAKING NEWS * * *", headlines)
-
-                    timeout_counter += 1
-                    time.sleep(1)
+                if len(headlines) > 0:
+                    self.events.publish(BreakingNews(headlines))
 
-            except Exception:
-                pass
-                self.Log("Error while sending Breaking News notification.")
+        def _breaking_news_notification():
+            notify = self.notification
+            notified = set()
+            # blocks until there's breaking news, or notifications are turned on/off
+            subscription = self.events.subscribe(BreakingNews, NotificationToggle, Shutdown)
+
+            while True:
+                try:
+                    event = subscription.get()
+
+                    if isinstance(event, Shutdown):
+                        subscription.close()
+                        break
+
+                    if isinstance(event, NotificationToggle):
+                        notify = event.enabled
+                        continue
+
+                    # don't toast the same headlines every minute
+                    news_briefing = [headline for headline in event.headlines if headline not in notified]
+                    if notify and len(news_briefing) > 0:
+                        notified.update(news_briefing)
+                        headlines = "".join(f">> {headline}\n\n" for headline in news_briefing)
+
+                        if len(headlines) > 255:
+                            # use the firts headline if the whole news is > 255 chars
+                            headlines = f">> {news_briefing[0]} ..more"
+                            if len(headlines) > 255:
+                                headlines = f">> {news_briefing[0][:240]}...more"
+
+                        self.skills.toast_notification("* * * BREAKING NEWS * * *", headlines)
+
+                except Exception:
+                    pass
+                    self.Log("Error while sending Breaking News notification.")
 
         """
         Main handler of virtual assistant
@@ -881,19 +1167,17 @@ class VirtualAssistant(SpeechAssistant):
             # volume up the music player, if applicable
             self.skills.music_volume(30)
 
-            if self.restart_request:
+            if self.restart_requested():
                 return False
 
             self.print(f"\n\n\"{self.assistant_name}\" is active...")
 
-            announcetime_thread = Thread(target=_heart_beat)
-            announcetime_thread.setDaemon(True)
-            announcetime_thread.start()
+            # hourly time announcement, daily notifications and the scheduled restart
+            _schedule_jobs()
+            self.scheduler.start()
 
             # announce breaking news notification
-            # every minute (60 sec)
-            breaking_news_notification = Thread(
-                target=_breaking_news_notification, args=(60,))
+            breaking_news_notification = Thread(target=_breaking_news_notification)
             breaking_news_notification.setDaemon(True)
             breaking_news_notification.start()
 
@@ -990,30 +1274,52 @@ class VirtualAssistant(SpeechAssistant):
             except Exception as ex:
                 self.Log(f"General Error while running virtual assistant.")
 
-        try:
-            # check internet connectivity every second
-            # before proceeding to starting virtual assistant
-            if check_connection():
-                self.skills = SkillsLibrary(super(), self.master_name, self.assistant_name)
-                # init news scraper (daemon)
-                self.news = self.skills.news_scraper()
-
-                while not _start_virtual_assistant():
-                    if self.restart_request:
-                        self.deactivate()
-                        break
+        # the same routes serve the microphone loop and the headless text server
+        self.wake_assistant = _wake_assistant
+        self.formulate_responses = _formulate_responses
+        self.start_virtual_assistant = _start_virtual_assistant
+
+    def load_skills(self):
+        # check internet connectivity every second
+        # before proceeding to starting virtual assistant
+        # (already checked, if this is a warm restart)
+        if self.warm.connected or check_connection():
+            self.warm.connected = True
+            self.skills = SkillsLibrary(super(), self.master_name, self.assistant_name)
+            # init news scraper (daemon), once per process
+            if self.warm.news is None:
+                self.warm.news = self.skills.news_scraper()
+            self.news = self.warm.news
+            return True
+
+        return False
 
-                    time.sleep(5)
-                    os.system("cls")
-                    brenda = VirtualAssistant(masters_name=self.master_name, assistants_name=self.assistant_name, listen_timeout=self.listen_timeout)
-                    brenda.maximize_command_interface()
-                    brenda.activate()
+    def respond_to_text(self, voice_data):
+        # headless entry point, answers the current session (see text_server.py)
+        voice_data = voice_data.strip().lower()
+        if voice_data:
+            if self.isSleeping():
+                # like the bot commands, let's use a wakeup command if she's sleeping
+                self.wake_assistant(0, f"hey {self.assistant_name} {voice_data}")
+            else:
+                self.formulate_responses(voice_data)
+
+    def activate(self):
+        self.build_routes()
+
+        try:
+            if self.load_skills():
+                self.start_virtual_assistant()
+                # the listen loop gave up (restart request or error),
+                # let the supervisor start a fresh instance instead of recursing
+                if not self.restart_requested():
+                    self.request_restart("Virtual assistant stopped unexpectedly.")
+                self.deactivate(f"restart {self.assistant_name}")
 
         except Exception:
             self.Log("Error while starting virtual assistant.")
             time.sleep(5)
-            self.bot_command = f"restart {self.assistant_name}"
             self.skill.music_volume(30)
             # set the restart flag to true
-            self.restart_request = True
-            self.deactivate()
+            self.request_restart("Error while starting virtual assistant.")
+            self.deactivate(f"restart {self.assistant_name}")
@@ -0,0 +1,382 @@
+import re
+import math
+import time
+from argparse import ArgumentParser
+
+# number words, looked up once per word instead of asking word2number for every token
+UNITS = {word: value for value, word in enumerate(["zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+                                                   "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen"])}
+TENS = {word: value * 10 for value, word in enumerate(["twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"], start=2)}
+SCALES = {"thousand": 1e3, "million": 1e6, "billion": 1e9, "trillion": 1e12}
+
+# spoken operators, longest phrases first so "divided by" wins over "divided"
+OPERATOR_PHRASES = sorted([
+    ("plus", "+"), ("add", "+"), ("+", "+"),
+    ("minus", "-"), ("subtract", "-"), ("-", "-"),
+    ("times", "*"), ("x", "*"), ("multiply", "*"), ("multiplied by", "*"), ("multiplied", "*"), ("*", "*"),
+    ("divided by", "/"), ("divide", "/"), ("divided", "/"), ("over", "/"), ("/", "/"),
+    ("to the power of", "^"), ("power of", "^"), ("raised to", "^"), ("^", "^"),
+    ("squared", "squared"), ("cubed", "cubed"),
+    ("square root of", "sqrt"), ("square root", "sqrt"), ("cube root of", "cbrt"), ("cube root", "cbrt"),
+    ("percent of", "% of"), ("% of", "% of"), ("percent", "%"), ("%", "%"),
+    ("negative", "neg"),
+    ("open parenthesis", "("), ("close parenthesis", ")"), ("(", "("), (")", ")"),
+], key=lambda phrase: -len(phrase[0].split()))
+
+# binary operators: precedence, right associative
+BINARY = {"+": (1, False), "-": (1, False), "*": (2, False), "/": (2, False), "of": (2, False), "^": (4, True)}
+# unary minus binds looser than a power, "negative two squared" is -(2^2)
+UNARY_PRECEDENCE = 3
+
+WORD_PATTERN = re.compile(r"\d+(?:\.\d+)?|[()+\-*/^%]|[a-z]+")
+
+# an "and" (or a comma) that joins two operands, not the one inside a number ("one hundred and five")
+OPERAND_AND = r"(?<!hundred)(?<!thousand)(?<!million)(?<!billion)(?<!trillion),? and |, "
+# the verb first phrasings with their operand lists ("add 3, 4 and 5", "multiply 2 by 3 by 4"),
+# said again the way the parser reads them: (verb and its operands, what separates the operands, operator)
+REPHRASINGS = [
+    (re.compile(r"\badd (.+)"), re.compile(rf"{OPERAND_AND}| to "), "plus"),
+    (re.compile(r"\bmultiply (.+)"), re.compile(rf"{OPERAND_AND}| by "), "times"),
+    (re.compile(r"\bdivide (.+)"), re.compile(r" by "), "divided by"),
+]
+# "subtract 3 and 4 from 10" is 10 - 3 - 4
+SUBTRACT = re.compile(r"\bsubtract (.+?) from (.+)")
+SUBTRACT_OPERANDS = re.compile(OPERAND_AND)
+VERBS = re.compile(r"\b(?:add|subtract|multiply|divide) ")
+
+
+class CalculatorError(ValueError):
+    pass
+
+
+def _rephrase(text):
+    text = text.lower()
+    if not VERBS.search(text):
+        # most calculations have none, the phrasings are only tried when one of their verbs was said
+        return text
+
+    match = SUBTRACT.search(text)
+    if match:
+        return text[:match.start()] + _join([match.group(2)] + SUBTRACT_OPERANDS.split(match.group(1)), "minus")
+
+    for pattern, separator, operator in REPHRASINGS:
+        match = pattern.search(text)
+        if match:
+            operands = separator.split(match.group(1))
+            if len(operands) > 1:
+                return text[:match.start()] + _join(operands, operator)
+    return text
+
+
+def _join(operands, operator):
+    # each operand in parentheses, "subtract 2 plus 1 from 10" is 10 - (2 + 1)
+    return f" {operator} ".join(f"({operand})" for operand in operands)
+
+
+def _words(text):
+    # "twenty-five" and "1,000" are one number, "what's" is just a word we skip
+    text = re.sub(r"\b(twenty|thirty|forty|fifty|sixty|seventy|eighty|ninety)-(?=[a-z])", r"\1 ", text.lower().replace(",", ""))
+    return WORD_PATTERN.findall(text)
+
+
+def _is_number_word(word):
+    return word in UNITS or word in TENS or word in SCALES or word == "hundred" or word[0].isdigit()
+
+
+def _read_number(words, index):
+    # one number from consecutive number words ("two hundred and five point three"), returns (value, next index)
+    total = 0.0
+    current = None
+    last = None
+
+    while index < len(words):
+        word = words[index]
+
+        if word[0].isdigit() or word in UNITS or word in TENS:
+            value = float(word) if word[0].isdigit() else (UNITS.get(word) if word in UNITS else TENS[word])
+            # "twenty five" is one number, "five five" (or "25 5") is two
+            if current is not None and not (last == "tens" and word in UNITS and 0 < value < 10) and last != "hundred":
+                break
+            current = (current or 0) + value
+            last = "digits" if word[0].isdigit() else ("tens" if word in TENS else "units")
+
+        elif word == "hundred":
+            current = (current or 1) * 100
+            last = "hundred"
+
+        elif word in SCALES:
+            total += (current or 1) * SCALES[word]
+            current = None
+            last = "scale"
+
+        elif word == "and" and current is not None and index + 1 < len(words) and _is_number_word(words[index + 1]) and last in ("hundred", "scale"):
+            # "one hundred and five"
+            pass
+
+        elif word in ("point", "dot") and index + 1 < len(words) and words[index + 1] in UNITS:
+            # "three point one four", digit by digit
+            decimals = ""
+            index += 1
+            while index < len(words) and words[index] in UNITS and UNITS[words[index]] < 10:
+                decimals += str(UNITS[words[index]])
+                index += 1
+            return total + (current or 0) + float(f"0.{decimals}"), index
+
+        else:
+            break
+
+        index += 1
+
+    return total + (current or 0), index
+
+
+def tokenize(text):
+    # [("num", value) or ("op", symbol)], the words that are neither ("what is", "hey brenda", "the") are skipped
+    words = _words(_rephrase(text))
+    tokens = []
+    index = 0
+
+    while index < len(words):
+        word = words[index]
+
+        if word == "a" and index + 1 < len(words) and (words[index + 1] == "hundred" or words[index + 1] in SCALES):
+            # "a million" is one million
+            value, index = _read_number(words, index + 1)
+            tokens.append(("num", value))
+            continue
+
+        if word[0].isdigit() or word in UNITS or word in TENS:
+            value, index = _read_number(words, index)
+            tokens.append(("num", value))
+            continue
+
+        for phrase, symbol in OPERATOR_PHRASES:
+            phrase_words = phrase.split()
+            if words[index:index + len(phrase_words)] == phrase_words:
+                if symbol == "% of":
+                    # "20 percent of 50" is 20% times 50
+                    tokens += [("op", "%"), ("op", "of")]
+                else:
+                    tokens.append(("op", symbol))
+                index += len(phrase_words)
+                break
+        else:
+            index += 1
+
+    return tokens
+
+
+class _Parser:
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not any(kind == "op" for kind, _ in self.tokens):
+            # a number alone isn't a calculation
+            raise CalculatorError("No operator.")
+
+        value, text = self.expression(0)
+        if self.position < len(self.tokens):
+            raise CalculatorError(f"Unexpected \"{self.peek()[1]}\".")
+        if not math.isfinite(value):
+            raise CalculatorError("The answer is too big.")
+        return value, text
+
+    def expression(self, min_precedence):
+        # precedence climbing, everything is evaluated while it's parsed (no tree, no eval)
+        lhs, lhs_text = self.unary()
+
+        while True:
+            kind, symbol = self.peek()
+            if kind != "op" or symbol not in BINARY:
+                break
+
+            precedence, right_associative = BINARY[symbol]
+            if precedence < min_precedence:
+                break
+
+            self.take()
+            rhs, rhs_text = self.expression(precedence if right_associative else precedence + 1)
+            lhs, lhs_text = _apply(symbol, lhs, rhs), f"{lhs_text} {symbol} {rhs_text}"
+
+        return lhs, lhs_text
+
+    def unary(self):
+        kind, symbol = self.peek()
+
+        if kind == "op" and symbol in ("-", "neg"):
+            self.take()
+            value, text = self.expression(UNARY_PRECEDENCE)
+            return -value, f"-{text}"
+
+        if kind == "op" and symbol in ("sqrt", "cbrt"):
+            self.take()
+            value, text = self.unary()
+            if symbol == "sqrt":
+                if value < 0:
+                    raise CalculatorError("Square root of a negative number.")
+                return math.sqrt(value), f"square root of {text}"
+            return math.copysign(abs(value) ** (1 / 3), value), f"cube root of {text}"
+
+        return self.postfix(*self.primary())
+
+    def primary(self):
+        kind, symbol = self.take()
+
+        if kind == "num":
+            return symbol, _format_number(symbol)
+
+        if symbol == "(":
+            value, text = self.expression(0)
+            if self.take()[1] != ")":
+                raise CalculatorError("Missing closing parenthesis.")
+            # "(10) - (3)" reads as "10 - 3"
+            return value, (f"({text})" if " " in text else text)
+
+        raise CalculatorError(f"Expected a number, got \"{symbol}\".")
+
+    def postfix(self, value, text):
+        while True:
+            kind, symbol = self.peek()
+            if kind != "op" or symbol not in ("squared", "cubed", "%"):
+                return value, text
+
+            self.take()
+            if symbol == "%":
+                value, text = value / 100, f"{text}%"
+            else:
+                value, text = _apply("^", value, 2 if symbol == "squared" else 3), f"{text} {symbol}"
+
+
+def _apply(symbol, lhs, rhs):
+    try:
+        if symbol == "+":
+            return lhs + rhs
+        if symbol == "-":
+            return lhs - rhs
+        if symbol in ("*", "of"):
+            return lhs * rhs
+        if symbol == "/":
+            return lhs / rhs
+        return math.pow(lhs, rhs)
+
+    except OverflowError:
+        raise CalculatorError("The answer is too big.")
+
+    except ValueError:
+        # e.g. a negative number to a fractional power
+        raise CalculatorError("The answer is not a real number.")
+
+
+def _format_number(value):
+    return str(int(value)) if value == int(value) else str(value)
+
+
+def evaluate(text):
+    # (answer, readable equation) of a spoken calculation, raises CalculatorError or ZeroDivisionError
+    return _Parser(tokenize(text)).parse()
+
+
+# (what was said, expected answer), None when it's not a calculation we should answer
+CORPUS = [
+    ("what is 2 plus 2", 4),
+    ("twenty five times four", 100),
+    ("what's one hundred and five minus five", 100),
+    ("two thousand three hundred forty five plus 5", 2350),
+    ("10 divided by 4", 2.5),
+    ("2 to the power of 10", 1024),
+    ("2 ^ 3 ^ 2", 512),
+    ("two power of three", 8),
+    ("square root of 16", 4),
+    ("square root of 16 plus 9", 13),
+    ("cube root of 27", 3),
+    ("cube root of negative 8", -2),
+    ("20 percent of 50", 10),
+    ("15% of 200", 30),
+    ("50 percent", .5),
+    ("(2 + 3) * 4", 20),
+    ("open parenthesis two plus three close parenthesis times four", 20),
+    ("2 + 3 * 4", 14),
+    ("10 - 4 - 3", 3),
+    ("100 / 10 / 5", 2),
+    ("negative two squared", -4),
+    ("five squared plus three cubed", 52),
+    ("three point one four times 2", 6.28),
+    ("1,000 plus 24", 1024),
+    ("twenty-five plus five", 30),
+    ("a million divided by a thousand", 1000),
+    ("7 x 6", 42),
+    ("hey brenda what is 9 minus 10", -1),
+    ("add 5 and 6", 11),
+    ("add 5 to 6", 11),
+    ("add one hundred and five and six", 111),
+    ("subtract 3 from 10", 7),
+    ("hey brenda subtract two plus one from ten", 7),
+    ("divide 10 by 2", 5),
+    ("divide twenty by four then", 5),
+    ("multiply 4 by 5", 20),
+    ("multiply 2 and one hundred and five", 210),
+    ("add milk and eggs", None),
+    ("add 3 and 4 and 5", 12),
+    ("add 3, 4, and 5", 12),
+    ("add one hundred and five and six and seven", 118),
+    ("multiply 2 by 3 by 4", 24),
+    ("multiply 2, 3 and 4", 24),
+    ("divide 100 by 2 by 5", 10),
+    ("subtract 1 and 2 from 10", 7),
+    ("what is five", None),
+    ("square root of negative 4", None),
+    ("a trillion times a trillion to the power of 30", None),
+    ("2 plus", None),
+    ("(2 + 3", None),
+    ("five five plus one", None),
+]
+
+
+def check():
+    failures = 0
+    for text, expected in CORPUS:
+        try:
+            answer, equation = evaluate(text)
+        except CalculatorError:
+            answer, equation = None, ""
+
+        passed = (answer is None) if expected is None else (answer is not None and abs(answer - expected) < 1e-9)
+        failures += not passed
+        print(f"{'ok  ' if passed else 'FAIL'} {text!r} -> {equation} = {answer} (expected {expected})")
+
+    print(f"{len(CORPUS) - failures} of {len(CORPUS)} passed")
+    return failures == 0
+
+
+def bench(rounds):
+    texts = [text for text, expected in CORPUS if expected is not None]
+
+    for name, func in (("tokenize", tokenize), ("evaluate", evaluate)):
+        start_time = time.perf_counter()
+        for _ in range(rounds):
+            for text in texts:
+                func(text)
+        elapsed = time.perf_counter() - start_time
+        print(f"{name}: {rounds * len(texts) / elapsed:,.0f} expressions/sec, {elapsed / (rounds * len(texts)) * 1e6:.1f} us each")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Spoken calculator: correctness corpus and micro-benchmark.")
+    parser.add_argument("mode", choices=["check", "bench"], help="Run the correctness corpus, or the micro-benchmark.")
+    parser.add_argument("--rounds", action="store", dest="rounds", type=int, default=2000, help="Benchmark, passes over the corpus.")
+
+    param = parser.parse_args()
+    if param.mode == "check":
+        raise SystemExit(0 if check() else 1)
+    bench(param.rounds)
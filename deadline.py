@@ -0,0 +1,66 @@
+import time
+from contextlib import contextmanager
+from threading import Lock
+from metrics import register_metrics
+
+metrics = {}
+metrics_lock = Lock()
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def _record(skill, key):
+    with metrics_lock:
+        skill_metrics = metrics.setdefault(skill, {"calls": 0, "overruns": 0, "skipped": 0})
+        skill_metrics[key] += 1
+
+
+def budget_metrics():
+    # how often each skill was called, blew the budget, or was skipped because the budget was spent
+    with metrics_lock:
+        return {skill: dict(skill_metrics) for skill, skill_metrics in metrics.items()}
+
+
+register_metrics("budget", budget_metrics)
+
+
+class Deadline:
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.expires_at = time.monotonic() + budget
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return self.remaining() <= 0
+
+    def allows(self, skill, minimum=0.0):
+        # skills call this before reaching a backend, and skip it when there's not enough time left
+        if self.remaining() > minimum:
+            return True
+
+        _record(skill, "skipped")
+        return False
+
+    def timeout(self, connect_timeout, read_timeout):
+        # http timeouts, bounded by the time left in the budget
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded("Response time budget is already spent.")
+
+        return (min(connect_timeout, remaining), min(read_timeout, remaining))
+
+    @contextmanager
+    def track(self, skill):
+        was_expired = self.expired()
+        try:
+            yield self
+
+        finally:
+            _record(skill, "calls")
+            if not was_expired and self.expired():
+                _record(skill, "overruns")
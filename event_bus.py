@@ -0,0 +1,84 @@
+from queue import Queue, Empty
+from threading import Lock
+
+
+class Event:
+    pass
+
+
+class BotCommand(Event):
+
+    def __init__(self, update_id, command):
+        self.update_id = update_id
+        self.command = command
+
+
+class Restart(Event):
+
+    def __init__(self, reason=""):
+        self.reason = reason
+
+
+class NotificationToggle(Event):
+
+    def __init__(self, enabled):
+        self.enabled = enabled
+
+
+class BreakingNews(Event):
+
+    def __init__(self, headlines):
+        self.headlines = headlines
+
+
+class Shutdown(Event):
+    pass
+
+
+class Subscription:
+
+    def __init__(self, bus, event_types):
+        self.bus = bus
+        self.event_types = event_types
+        self.queue = Queue()
+
+    def get(self, timeout=None):
+        # block until one of the subscribed events is published, raises queue.Empty on timeout
+        return self.queue.get(timeout=timeout)
+
+    def get_nowait(self):
+        # the next pending event, or None
+        try:
+            return self.queue.get_nowait()
+        except Empty:
+            return None
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+
+    def __init__(self):
+        self.subscriptions = []
+        self.lock = Lock()
+
+    def subscribe(self, *event_types):
+        subscription = Subscription(self, event_types)
+        with self.lock:
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def publish(self, event):
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+
+        # every subscriber gets its own copy in its own queue, in the order the events were published
+        for subscription in subscriptions:
+            if isinstance(event, subscription.event_types):
+                subscription.queue.put(event)
@@ -0,0 +1,153 @@
+import asyncio
+import time
+from argparse import ArgumentParser
+from aiohttp import web
+from telegram_async import AsyncTelegramBot
+
+
+class FakeBotApi:
+
+    def __init__(self, token="TEST:TOKEN", host="127.0.0.1", port=0):
+        self.token = token
+        self.host = host
+        self.port = port
+        self.updates = []
+        self.next_update_id = 1
+        self.sent_messages = []
+        # number of upcoming requests to fail, to exercise the reconnect behavior
+        self.failures = 0
+        self.new_update = None
+        self.runner = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}/bot{self.token}/"
+
+    async def start(self):
+        self.new_update = asyncio.Condition()
+
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+
+        # port 0 lets the OS pick a free port
+        self.port = self.runner.addresses[0][1]
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def push_update(self, chat_id, text):
+        async with self.new_update:
+            self.updates.append({"update_id": self.next_update_id, "pushed_at": time.perf_counter(),
+                                 "message": {"message_id": self.next_update_id, "chat": {"id": chat_id}, "text": text}})
+            self.next_update_id += 1
+            self.new_update.notify_all()
+
+    def fail_next(self, count):
+        self.failures += count
+
+    async def handle(self, request):
+        if request.match_info["token"] != self.token:
+            return web.json_response({"ok": False, "error_code": 401, "description": "Unauthorized"}, status=401)
+
+        if self.failures > 0:
+            self.failures -= 1
+            return web.json_response({"ok": False, "error_code": 502, "description": "Bad Gateway"}, status=502)
+
+        params = dict(request.query)
+        if request.method == "POST":
+            params.update(await request.post())
+
+        method = request.match_info["method"]
+        if method == "getUpdates":
+            return await self.get_updates(params)
+        elif method == "sendMessage":
+            return self.send_message(params)
+
+        return web.json_response({"ok": False, "error_code": 404, "description": "Not Found"}, status=404)
+
+    async def get_updates(self, params):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+
+        async with self.new_update:
+            # an offset confirms (and forgets) every update before it, just like the real Bot API
+            self.updates = [update for update in self.updates if update["update_id"] >= offset]
+
+            if not self.updates and timeout > 0:
+                try:
+                    await asyncio.wait_for(self.new_update.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+            result = [{key: value for key, value in update.items() if key != "pushed_at"} for update in self.updates[:100]]
+
+        return web.json_response({"ok": True, "result": result})
+
+    def send_message(self, params):
+        if not params.get("chat_id") or not params.get("text"):
+            return web.json_response({"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"}, status=400)
+
+        self.sent_messages.append({"chat_id": params["chat_id"], "text": params["text"], "received_at": time.perf_counter()})
+        return web.json_response({"ok": True, "result": {"message_id": len(self.sent_messages), "chat": {"id": params["chat_id"]}, "text": params["text"]}})
+
+
+async def load_test(chats, messages, failures):
+    server = FakeBotApi()
+    await server.start()
+
+    bot = AsyncTelegramBot(url=server.url)
+    # keep the long poll short so the test finishes right after the last message
+    bot.TELEGRAM_POLL_TIMEOUT = 1
+    pushed_at = {}
+
+    async def echo(bot, update):
+        await bot.send_message(f"echo {update['message']['text']}", chat_id=update["message"]["chat"]["id"])
+
+    poll_task = asyncio.create_task(bot.poll(echo))
+    start_time = time.perf_counter()
+
+    for count in range(messages):
+        for chat_id in range(1, chats + 1):
+            text = f"{chat_id}-{count}"
+            pushed_at[text] = time.perf_counter()
+            await server.push_update(chat_id, text)
+
+        if failures and count == messages // 2:
+            # drop a few requests in the middle of the run to measure the reconnect behavior
+            server.fail_next(failures)
+
+        await asyncio.sleep(0)
+
+    total = chats * messages
+    while len(server.sent_messages) < total:
+        await asyncio.sleep(0.01)
+
+    elapsed = time.perf_counter() - start_time
+    latencies = sorted(message["received_at"] - pushed_at[message["text"].replace("echo ", "")] for message in server.sent_messages)
+
+    poll_task.cancel()
+    await asyncio.gather(poll_task, return_exceptions=True)
+    await bot.close()
+    await server.stop()
+
+    print(f"Command: python fake_bot_api.py --chats {chats} --messages {messages} --failures {failures}")
+    print(f"Chats: {chats}, Messages: {total}, Injected failures: {failures}")
+    print(f"Throughput: {total / elapsed:.1f} messages/sec")
+    print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, p95: {latencies[int(len(latencies) * .95)] * 1000:.1f} ms, max: {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Load test the asyncio Telegram bot against a local stand-in Bot API server.")
+    parser.add_argument("--chats", action="store", dest="chats", type=int, default=50, help="Number of concurrent chats.")
+    parser.add_argument("--messages", action="store", dest="messages", type=int, default=20, help="Number of messages per chat.")
+    # throughput by default, --failures N measures the reconnect instead (the 1 + 2 + 4... s backoff dominates the latency)
+    parser.add_argument("--failures", action="store", dest="failures", type=int, default=0, help="Number of failed requests to inject (0 for a throughput run).")
+
+    param = parser.parse_args()
+    asyncio.run(load_test(param.chats, param.messages, param.failures))
@@ -7,9 +7,13 @@ import requests
 import linecache
 import logging
 import time
-import concurrent.futures as executor
+import subprocess
+from contextlib import contextmanager
+from threading import Condition
 from random import choice
 from settings import Configuration
+from http_client import http_get
+from task_pool import run_in_background
 
 
 config = Configuration()
@@ -73,8 +77,10 @@ def is_match(voice_data, keywords):
 
 def get_commands_from_json():
     try:
-        if os.path.isfile(config.COMMANDS_DB):
-            with open(config.COMMANDS_DB, "r", encoding="utf-8") as fl:
+        # relative to the assistant's directory, whatever the current working directory is
+        commands_db = os.path.join(config.ASSISTANT_DIR, config.COMMANDS_DB)
+        if os.path.isfile(commands_db):
+            with open(commands_db, "r", encoding="utf-8") as fl:
                 return json.load(fl)["command_db"]
 
     except Exception:
@@ -150,17 +156,74 @@ def extract_metadata(voice_data, commands):
 
 
 def execute_map(func, *argv):
-    task = ""
+    category = "task"
 
     if "open browser" in str(func):
         func = webbrowser.get().open_new
+        category = "open browser"
     elif "open system" in str(func):
         func = os.system
+        category = "open system"
 
-    with executor.ThreadPoolExecutor() as exec:
-        task = [result for result in zip(*argv, exec.map(func, *argv))]
+    # fire-and-forget, one task per item on the shared task pool (no new thread or executor per call)
+    return [run_in_background(category, func, *args) for args in zip(*argv)]
 
-    return task
+
+def start_console(command, cwd):
+    # open a batch file on a new console window, started in its own directory (no os.chdir)
+    return subprocess.Popen(f"start cmd /k {command}", shell=True, cwd=cwd)
+
+
+class WorkingDirectory:
+
+    def __init__(self):
+        self.condition = Condition()
+        self.current = None
+        self.holders = 0
+
+    @contextmanager
+    def use(self, path):
+        with self.condition:
+            # threads that need the same directory share it, another directory waits until they're done
+            while self.holders and self.current != path:
+                self.condition.wait()
+
+            if not self.holders:
+                os.chdir(path)
+                self.current = path
+            self.holders += 1
+
+        try:
+            yield path
+
+        finally:
+            with self.condition:
+                self.holders -= 1
+                if not self.holders:
+                    os.chdir(config.ASSISTANT_DIR)
+                    self.current = None
+                    self.condition.notify_all()
+
+
+working_directory = WorkingDirectory()
+
+
+def in_directory(path):
+    # only for the external libraries (music player, news scraper) that read their files relative to the
+    # current directory, our own code uses absolute paths and cwd=. hold it while the files are read, never across network calls
+    return working_directory.use(path)
+
+
+def run_in_directory(path, code, timeout=None):
+    # run python code in its own process started in path (cwd=), for the external library calls that are slow
+    # (scrapers, toasts), so they don't hold the working directory. returns what the code printed
+    result = subprocess.run([sys.executable, "-c", code], cwd=path, capture_output=True, text=True, timeout=timeout, check=True)
+    return result.stdout
+
+
+def start_in_directory(path, code):
+    # same, without waiting for it to finish (nothing to read back, e.g. a toast that stays up until it's dismissed)
+    return subprocess.Popen([sys.executable, "-c", code], cwd=path)
 
 
 def check_connection():
@@ -171,7 +234,7 @@ def check_connection():
             os.system("cls")
             print("\n Checking internet connectivity...", end="")
             retry_count += 1
-            response = requests.get("http://google.com", timeout=300)
+            response = http_get("http://google.com")
 
             # 200 means we got connection to web
             if response.status_code == 200:
@@ -0,0 +1,213 @@
+import time
+import requests
+from threading import Lock
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from settings import Configuration
+from deadline import DeadlineExceeded
+from metrics import register_metrics
+
+config = Configuration()
+
+
+class CircuitOpenError(requests.ConnectionError):
+    pass
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold, reset_timeout):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0
+        self.lock = Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+
+            # let exactly one probe request through once the backend had time to recover
+            if self.state == self.OPEN and (time.monotonic() - self.opened_at) >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            # a failed probe opens the circuit again right away
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+class RetryBudget:
+
+    def __init__(self, ratio, max_tokens):
+        # every request earns a fraction of a retry, so retries never exceed that ratio of the traffic
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+        self.lock = Lock()
+
+    def deposit(self):
+        with self.lock:
+            self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def withdraw(self):
+        with self.lock:
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class HttpClient:
+
+    def __init__(self, connect_timeout, read_timeout, pool_size):
+        self.timeout = (connect_timeout, read_timeout)
+        # one session for the whole application, the adapter keeps a keep-alive
+        # connection pool per host, so handshakes are paid once per host and not per request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self.metrics = {}
+        self.metrics_lock = Lock()
+
+        self.breakers = {}
+        self.retry_budget = RetryBudget(config.RETRY_BUDGET_RATIO, config.RETRY_BUDGET_MAX)
+
+    def breaker(self, host):
+        with self.metrics_lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(config.BREAKER_FAILURE_THRESHOLD, config.BREAKER_RESET_TIMEOUT)
+            return self.breakers[host]
+
+    def _record(self, host, elapsed, failed=False, rejected=False):
+        with self.metrics_lock:
+            host_metrics = self.metrics.setdefault(host, {"requests": 0, "errors": 0, "rejected": 0, "retries": 0, "total_time": 0.0, "max_time": 0.0})
+            if rejected:
+                host_metrics["rejected"] += 1
+                return
+
+            host_metrics["requests"] += 1
+            host_metrics["total_time"] += elapsed
+            host_metrics["max_time"] = max(host_metrics["max_time"], elapsed)
+            if failed:
+                host_metrics["errors"] += 1
+
+    def _record_retry(self, host):
+        with self.metrics_lock:
+            self.metrics[host]["retries"] += 1
+
+    def call(self, host, func, *args, failure_types=(requests.RequestException,), **kwargs):
+        # guard any backend call (not just our own http requests) with the host's circuit breaker
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            self._record(host, 0, rejected=True)
+            raise CircuitOpenError(f"Circuit is open for {host}, skipping the request.")
+
+        start_time = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+
+        except failure_types:
+            breaker.record_failure()
+            self._record(host, time.perf_counter() - start_time, failed=True)
+            raise
+
+        except Exception:
+            # any other error means the backend did respond
+            breaker.record_success()
+            self._record(host, time.perf_counter() - start_time)
+            raise
+
+        breaker.record_success()
+        self._record(host, time.perf_counter() - start_time)
+        return result
+
+    def _send(self, method, url, timeout, **kwargs):
+        response = self.session.request(method, url, timeout=timeout, **kwargs)
+        if response.status_code >= 500:
+            # count server errors as failures of the backend
+            response.close()
+            response.raise_for_status()
+        return response
+
+    def request(self, method, url, timeout=None, deadline=None, **kwargs):
+        host = urlparse(url).netloc
+        self.retry_budget.deposit()
+        retried = False
+
+        while True:
+            try:
+                # no request is sent without a timeout, so no call can hang the assistant,
+                # and the timeout never goes past the deadline of the utterance being answered
+                request_timeout = (timeout or self.timeout)
+                if deadline:
+                    request_timeout = deadline.timeout(*request_timeout)
+
+                return self.call(host, self._send, method, url, request_timeout, **kwargs)
+
+            except CircuitOpenError:
+                raise
+
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError):
+                # retry an idempotent request once, and only while the global retry budget allows it
+                if retried or method != "GET" or (deadline and deadline.expired()) or not self.retry_budget.withdraw():
+                    raise
+                retried = True
+                self._record_retry(host)
+
+    def get_metrics(self):
+        with self.metrics_lock:
+            return {host: dict(host_metrics, average_time=(host_metrics["total_time"] / max(host_metrics["requests"], 1)), circuit=self.breakers[host].state) for host, host_metrics in self.metrics.items()}
+
+
+client = HttpClient(config.HTTP_CONNECT_TIMEOUT, config.HTTP_READ_TIMEOUT, config.HTTP_POOL_SIZE)
+# requests, failures, retries and circuit state per host
+register_metrics("http", lambda: client.get_metrics())
+
+
+def http_get(url, timeout=None, deadline=None, **kwargs):
+    return client.request("GET", url, timeout=timeout, deadline=deadline, **kwargs)
+
+
+def resolve_url(url, timeout=None, deadline=None):
+    try:
+        # follow the redirects without downloading the page, we only need the final url
+        response = http_get(url, timeout=timeout, deadline=deadline, stream=True)
+        response.close()
+        return response.url
+
+    except (requests.RequestException, DeadlineExceeded):
+        # the link we have still works, it's just not the redirected one
+        return url
+
+
+def http_metrics():
+    return client.get_metrics()
+
+
+def is_reachable(host):
+    # false while the host's circuit is open (it kept failing, and it's not time for a probe yet)
+    breaker = client.breakers.get(host)
+    return breaker is None or breaker.state != CircuitBreaker.OPEN
+
+
+def guarded_call(host, func, *args, failure_types=(requests.RequestException,), **kwargs):
+    return client.call(host, func, *args, failure_types=failure_types, **kwargs)
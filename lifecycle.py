@@ -0,0 +1,18 @@
+class RestartAssistant(BaseException):
+    # like SystemExit, it unwinds past the "except Exception" handlers of the listen loop,
+    # up to the supervisor in main.py which restarts the assistant in-process
+    pass
+
+
+class WarmState:
+
+    def __init__(self):
+        # components that survive an in-process restart
+        self.bot = None
+        self.webhook = None
+        self.events = None
+        self.bot_commands = None
+        self.news = None
+        self.connected = False
+        self.snapshot = None
+        self.restarts = 0
@@ -1,21 +1,47 @@
 import os
 import time
 from assitant import VirtualAssistant
+from lifecycle import RestartAssistant, WarmState
+from skill_workers import start_skill_workers, stop_skill_workers
+from task_pool import shutdown_tasks
+from skills_library import close_stores
 
 
 def create_instance():
     os.system("cls")
-    brenda = None
+    # the bot, news scraper and connection check outlive each instance,
+    # so a restart only re-creates the assistant itself (no new process, no recursion)
+    warm = WarmState()
+    # like the warm state, the skill worker processes (if enabled) outlive the restarts
+    start_skill_workers()
 
     try:
-        brenda = VirtualAssistant(masters_name="Dave", assistants_name="Brenda", listen_timeout=10)
-        brenda.maximize_command_interface()
-        brenda.activate()
-
-    except Exception as ex:
-        print(f"Critical Error occurred, trying to start a new instance... {str(ex)}")
-        time.sleep(5)
-        create_instance()
+        while True:
+            brenda = None
+
+            try:
+                brenda = VirtualAssistant(masters_name="Dave", assistants_name="Brenda", listen_timeout=10, warm=warm)
+                brenda.maximize_command_interface()
+                brenda.activate()
+                break
+
+            except RestartAssistant:
+                warm.restarts += 1
+                print(f" Restarting in-process... (restart #{warm.restarts})")
+
+            except Exception as ex:
+                print(f"Critical Error occurred, trying to start a new instance... {str(ex)}")
+                time.sleep(5)
+
+            finally:
+                if brenda:
+                    brenda.shutdown()
+
+    finally:
+        # terminated, let the running background tasks finish and stop the skill workers, then close the stores they used
+        shutdown_tasks()
+        stop_skill_workers()
+        close_stores()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,43 @@
+import os
+import json
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+# name -> function returning that component's metrics (json serializable)
+_sources = {}
+_lock = Lock()
+
+
+def register_metrics(name, get_metrics):
+    with _lock:
+        _sources[name] = get_metrics
+
+
+def collect_metrics():
+    with _lock:
+        sources = dict(_sources)
+
+    metrics = {}
+    for name, get_metrics in sources.items():
+        try:
+            metrics[name] = get_metrics()
+
+        except Exception:
+            # one broken source doesn't hide the others
+            logger.exception(f"Error while collecting the \"{name}\" metrics.")
+
+    return metrics
+
+
+def write_metrics(metrics_file):
+    try:
+        # write to a temporary file first, a reader never sees a half written file
+        temp_file = f"{metrics_file}.tmp"
+        with open(temp_file, "w", encoding="utf-8") as fl:
+            json.dump(collect_metrics(), fl, indent=2)
+        os.replace(temp_file, metrics_file)
+
+    except Exception:
+        logger.exception("Error while writing the metrics file.")
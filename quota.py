@@ -0,0 +1,64 @@
+import logging
+from datetime import datetime as dt
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class QuotaTracker:
+
+    def __init__(self, name, limit, reserve_ratio):
+        # counts the calls made with an api key in the current month, the provider resets it every month
+        self.name = name
+        self.limit = limit
+        self.reserve_ratio = reserve_ratio
+        self.period = self._current_period()
+        self.used = 0
+        self.lock = Lock()
+
+    def _current_period(self):
+        return dt.now().strftime("%Y-%m")
+
+    def _roll_over(self):
+        period = self._current_period()
+        if period != self.period:
+            self.period = period
+            self.used = 0
+
+    def spend(self, count=1):
+        with self.lock:
+            self._roll_over()
+            was_low = self._is_low()
+            self.used += count
+            if not was_low and self._is_low():
+                logger.warning(f"{self.name} quota is running low ({self.used} of {self.limit} used), switching to fallbacks.")
+
+    def _is_low(self):
+        # the last part of the quota is kept for what only this api can answer
+        return self.used >= self.limit * (1 - self.reserve_ratio)
+
+    def is_low(self):
+        with self.lock:
+            self._roll_over()
+            return self._is_low()
+
+    def is_exhausted(self):
+        with self.lock:
+            self._roll_over()
+            return self.used >= self.limit
+
+    def get_metrics(self):
+        with self.lock:
+            self._roll_over()
+            return {"period": self.period, "used": self.used, "limit": self.limit, "remaining": max(0, self.limit - self.used), "low": self._is_low()}
+
+    def snapshot(self):
+        with self.lock:
+            return {"period": self.period, "used": self.used}
+
+    def restore(self, state):
+        with self.lock:
+            # last month's usage doesn't count anymore
+            if state.get("period") == self._current_period():
+                self.period = state["period"]
+                self.used = max(self.used, state["used"])
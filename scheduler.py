@@ -0,0 +1,154 @@
+import heapq
+import itertools
+import logging
+from datetime import datetime as dt, timedelta
+from threading import Thread, Condition
+
+logger = logging.getLogger(__name__)
+
+# what to do with the runs a job missed (machine asleep, a long job blocked the scheduler, etc.)
+CATCH_UP_SKIP = "skip"      # drop the missed runs, wait for the next one
+CATCH_UP_ONCE = "once"      # run once for all the missed runs
+CATCH_UP_ALL = "all"        # run every missed run
+
+
+class Job:
+
+    def __init__(self, name, func, next_time, first_run, catch_up=CATCH_UP_ONCE, misfire_grace=60):
+        self.name = name
+        self.func = func
+        # returns the next run time after the given datetime, or None for one-shot jobs
+        self.next_time = next_time
+        self.run_at = first_run
+        self.catch_up = catch_up
+        self.misfire_grace = timedelta(seconds=misfire_grace)
+        self.cancelled = False
+
+
+def hourly_at(minute=0, second=0):
+    def _next_time(after):
+        run_at = after.replace(minute=minute, second=second, microsecond=0)
+        return run_at if run_at > after else run_at + timedelta(hours=1)
+    return _next_time
+
+
+def daily_at(hour=0, minute=0, second=0):
+    def _next_time(after):
+        run_at = after.replace(hour=hour, minute=minute, second=second, microsecond=0)
+        return run_at if run_at > after else run_at + timedelta(days=1)
+    return _next_time
+
+
+def every(seconds):
+    def _next_time(after):
+        return after + timedelta(seconds=seconds)
+    return _next_time
+
+
+class Scheduler:
+
+    def __init__(self):
+        self.jobs = []
+        self.jobs_by_name = {}
+        self.sequence = itertools.count()
+        self.condition = Condition()
+        self.running = False
+        self.thread = None
+
+    def _push(self, job):
+        heapq.heappush(self.jobs, (job.run_at, next(self.sequence), job))
+
+    def add_job(self, name, func, next_time=None, first_run=None, catch_up=CATCH_UP_ONCE, misfire_grace=60):
+        now = dt.now()
+        job = Job(name, func, next_time, (first_run or next_time(now)), catch_up, misfire_grace)
+
+        with self.condition:
+            # a job with the same name is replaced
+            self._cancel(name)
+            self.jobs_by_name[name] = job
+            self._push(job)
+            # wake the scheduler thread, the new job may be due before the one it's waiting for
+            self.condition.notify()
+
+        return job
+
+    def at(self, name, run_at, func):
+        return self.add_job(name, func, first_run=run_at)
+
+    def after(self, name, seconds, func):
+        return self.add_job(name, func, first_run=(dt.now() + timedelta(seconds=seconds)))
+
+    def _cancel(self, name):
+        job = self.jobs_by_name.pop(name, None)
+        if job:
+            job.cancelled = True
+
+    def cancel(self, name):
+        with self.condition:
+            self._cancel(name)
+            self.condition.notify()
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._run)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+
+    def _next_due_job(self):
+        with self.condition:
+            while self.running:
+                # drop the cancelled jobs on top of the heap
+                while self.jobs and self.jobs[0][2].cancelled:
+                    heapq.heappop(self.jobs)
+
+                if not self.jobs:
+                    # nothing to do, sleep until a job is added
+                    self.condition.wait()
+                    continue
+
+                delay = (self.jobs[0][0] - dt.now()).total_seconds()
+                if delay > 0:
+                    # sleep exactly until the next job is due (or a new job/cancel wakes us up)
+                    self.condition.wait(delay)
+                    continue
+
+                return heapq.heappop(self.jobs)[2]
+
+        return None
+
+    def _run(self):
+        while self.running:
+            job = self._next_due_job()
+            if job is None:
+                break
+
+            now = dt.now()
+            missed = (now - job.run_at) > job.misfire_grace
+
+            if not missed or job.catch_up != CATCH_UP_SKIP:
+                try:
+                    job.func()
+                except Exception:
+                    logger.exception(f"Error while running scheduled job \"{job.name}\".")
+
+            if job.next_time is None:
+                with self.condition:
+                    if self.jobs_by_name.get(job.name) is job:
+                        del self.jobs_by_name[job.name]
+                continue
+
+            # schedule from the planned run time so the job doesn't drift,
+            # unless we only want a single catch-up run for everything missed
+            next_run = job.next_time(job.run_at)
+            if next_run <= dt.now() and job.catch_up != CATCH_UP_ALL:
+                next_run = job.next_time(dt.now())
+            job.run_at = next_run
+
+            with self.condition:
+                if not job.cancelled:
+                    self._push(job)
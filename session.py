@@ -0,0 +1,61 @@
+import time
+import uuid
+from contextlib import contextmanager
+from threading import local, Lock
+
+# the session being served by the current thread (headless text server), None for the microphone loop
+_current = local()
+
+
+class Session:
+
+    def __init__(self, session_id=None, room=""):
+        self.session_id = session_id or uuid.uuid4().hex
+        # front-end (room) the session belongs to, if any
+        self.room = room
+        # per session, so one user putting the assistant to sleep doesn't mute the others
+        self.sleeping = False
+        self.replies = []
+        self.ended = False
+        self.last_seen = time.monotonic()
+        # one request at a time per session, sessions are served concurrently
+        self.lock = Lock()
+
+    def reply(self, text):
+        if text.strip():
+            self.replies.append(text.strip())
+
+    def take_replies(self):
+        replies, self.replies = self.replies, []
+        return replies
+
+    def end(self):
+        self.ended = True
+
+
+def current_session():
+    return getattr(_current, "session", None)
+
+
+def bind_session(func):
+    # func will run on another thread, but should still answer the caller's session
+    session = current_session()
+    if session is None:
+        return func
+
+    def _in_session(*args, **kwargs):
+        with session_scope(session):
+            return func(*args, **kwargs)
+    return _in_session
+
+
+@contextmanager
+def session_scope(session):
+    previous = current_session()
+    _current.session = session
+    session.last_seen = time.monotonic()
+    try:
+        yield session
+
+    finally:
+        _current.session = previous
@@ -26,7 +26,94 @@ class Configuration:
         self.DEV_PATH_DIR = config("DEV_PATH_DIR")
 
         self.WOLFRAM_APP_ID = config("WOLFRAM_APP_ID")
+        self.WOLFRAM_URL = config("WOLFRAM_URL", default="https://api.wolframalpha.com/v2/query")
+
+        # seconds a Wolfram|Alpha answer is reused, by kind of question (time questions are never cached, day questions until midnight)
+        self.WOLFRAM_CACHE_TTL = config("WOLFRAM_CACHE_TTL", default=600, cast=int)
+        self.WOLFRAM_WEATHER_TTL = config("WOLFRAM_WEATHER_TTL", default=1800, cast=int)
+        self.WOLFRAM_DEFINITION_TTL = config("WOLFRAM_DEFINITION_TTL", default=(3 * 86400), cast=int)
+        # Wolfram|Alpha calls per month on our app id, and the part of it kept for the weather (time and day questions fall back to the clock)
+        self.WOLFRAM_MONTHLY_QUOTA = config("WOLFRAM_MONTHLY_QUOTA", default=2000, cast=int)
+        self.WOLFRAM_QUOTA_RESERVE = config("WOLFRAM_QUOTA_RESERVE", default=0.2, cast=float)
+
+        # shared http client, default timeouts (seconds) and connection pool size per host
+        self.HTTP_CONNECT_TIMEOUT = config("HTTP_CONNECT_TIMEOUT", default=5, cast=float)
+        self.HTTP_READ_TIMEOUT = config("HTTP_READ_TIMEOUT", default=15, cast=float)
+        self.HTTP_POOL_SIZE = config("HTTP_POOL_SIZE", default=10, cast=int)
+        # seconds an utterance may spend gathering answers before skills start to skip slow backends
+        self.RESPONSE_BUDGET = config("RESPONSE_BUDGET", default=6, cast=float)
+        self.BRIEFING_BUDGET = config("BRIEFING_BUDGET", default=30, cast=float)
+        # threads fetching the sections of "what's happening today" at the same time
+        self.BRIEFING_WORKERS = config("BRIEFING_WORKERS", default=12, cast=int)
+        # the briefing is built every interval (seconds) within these hours, and its sections stay fresh for a while (others until midnight)
+        self.BRIEFING_PRECOMPUTE_FROM = config("BRIEFING_PRECOMPUTE_FROM", default=5, cast=int)
+        self.BRIEFING_PRECOMPUTE_UNTIL = config("BRIEFING_PRECOMPUTE_UNTIL", default=11, cast=int)
+        self.BRIEFING_PRECOMPUTE_INTERVAL = config("BRIEFING_PRECOMPUTE_INTERVAL", default=1800, cast=int)
+        self.BRIEFING_NEWS_TTL = config("BRIEFING_NEWS_TTL", default=900, cast=int)
+        self.BRIEFING_WEATHER_TTL = config("BRIEFING_WEATHER_TTL", default=1800, cast=int)
+        self.WIKIPEDIA_MIN_BUDGET = config("WIKIPEDIA_MIN_BUDGET", default=2, cast=float)
+        # Wikipedia summaries kept on disk (most bytes, compressed), and the names in the news looked up ahead of time (off by default)
+        self.WIKIPEDIA_CACHE_FILE = config("WIKIPEDIA_CACHE_FILE", default="wikipedia_cache.db")
+        self.WIKIPEDIA_CACHE_SIZE = config("WIKIPEDIA_CACHE_SIZE", default=(20 * 1024 * 1024), cast=int)
+        self.WIKIPEDIA_PREFETCH = config("WIKIPEDIA_PREFETCH", default=False, cast=bool)
+        self.WIKIPEDIA_PREFETCH_INTERVAL = config("WIKIPEDIA_PREFETCH_INTERVAL", default=3600, cast=int)
+        # knowledge answers kept for when the sources are down, written in batches (answers, or seconds, whichever comes first)
+        self.ANSWER_STORE_FILE = config("ANSWER_STORE_FILE", default="answer_store.db")
+        self.ANSWER_STORE_BATCH = config("ANSWER_STORE_BATCH", default=20, cast=int)
+        self.ANSWER_STORE_FLUSH_INTERVAL = config("ANSWER_STORE_FLUSH_INTERVAL", default=60, cast=int)
+        # consecutive failures before a host's circuit opens, and seconds until a probe request is let through
+        self.BREAKER_FAILURE_THRESHOLD = config("BREAKER_FAILURE_THRESHOLD", default=5, cast=int)
+        self.BREAKER_RESET_TIMEOUT = config("BREAKER_RESET_TIMEOUT", default=30, cast=float)
+        # retries allowed per request made, and the most retries that can be saved up
+        self.RETRY_BUDGET_RATIO = config("RETRY_BUDGET_RATIO", default=0.1, cast=float)
+        self.RETRY_BUDGET_MAX = config("RETRY_BUDGET_MAX", default=10, cast=int)
+
+        # threads shared by the background tasks (open browser, launch apps), and how many tasks may wait for one
+        self.TASK_WORKERS = config("TASK_WORKERS", default=8, cast=int)
+        self.TASK_QUEUE_SIZE = config("TASK_QUEUE_SIZE", default=32, cast=int)
+        # worker processes for the skills that can hang or crash (0 runs them inline), and their timeouts (seconds)
+        self.SKILL_WORKERS = config("SKILL_WORKERS", default=0, cast=int)
+        self.SKILL_TIMEOUT = config("SKILL_TIMEOUT", default=10, cast=float)
+        self.FILE_SEARCH_TIMEOUT = config("FILE_SEARCH_TIMEOUT", default=300, cast=float)
+        # seconds the fun holiday scraper process gets
+        self.FUN_HOLIDAY_TIMEOUT = config("FUN_HOLIDAY_TIMEOUT", default=60, cast=float)
+        # seconds a headless text session is kept after its last message
+        self.SESSION_TIMEOUT = config("SESSION_TIMEOUT", default=1800, cast=int)
+        # shared token a text server client sends (X-Token header), the server doesn't start without one
+        self.TEXT_SERVER_TOKEN = config("TEXT_SERVER_TOKEN", default="")
+        # same for the voice link, a front-end sends it in its hello frame
+        self.VOICE_LINK_TOKEN = config("VOICE_LINK_TOKEN", default="")
+        # warm state (reported news, the day's fun holiday, etc.) restored on startup, and saved every few minutes
+        self.SNAPSHOT_FILE = config("SNAPSHOT_FILE", default="warm_state.json")
+        self.SNAPSHOT_INTERVAL = config("SNAPSHOT_INTERVAL", default=300, cast=int)
+        # the assistant's metrics (also on the text server's /metrics), written to this file every interval (seconds)
+        self.METRICS_FILE = config("METRICS_FILE", default="metrics.json")
+        self.METRICS_INTERVAL = config("METRICS_INTERVAL", default=60, cast=int)
 
         self.TELEGRAM_TOKEN = config("TELEGRAM_TOKEN")
         self.TELEGRAM_CHAT_ID = config("TELEGRAM_CHAT_ID")
         self.TELEGRAM_URL = config("TELEGRAM_URL")
+        # seconds Telegram holds a getUpdates request open while waiting for new messages
+        self.TELEGRAM_POLL_TIMEOUT = config("TELEGRAM_POLL_TIMEOUT", default=50, cast=int)
+        self.TELEGRAM_CONNECT_TIMEOUT = config("TELEGRAM_CONNECT_TIMEOUT", default=5, cast=int)
+        self.TELEGRAM_READ_TIMEOUT = config("TELEGRAM_READ_TIMEOUT", default=15, cast=int)
+        # outgoing message queue, pacing (messages per second) and merge window (seconds)
+        self.TELEGRAM_OUTBOX_SIZE = config("TELEGRAM_OUTBOX_SIZE", default=100, cast=int)
+        self.TELEGRAM_SEND_RATE = config("TELEGRAM_SEND_RATE", default=1.0, cast=float)
+        self.TELEGRAM_SEND_BURST = config("TELEGRAM_SEND_BURST", default=3, cast=int)
+        self.TELEGRAM_SEND_RETRIES = config("TELEGRAM_SEND_RETRIES", default=4, cast=int)
+        self.TELEGRAM_COALESCE_WINDOW = config("TELEGRAM_COALESCE_WINDOW", default=0.3, cast=float)
+        # handled update offset and unhandled commands, kept across restarts
+        self.TELEGRAM_OFFSET_FILE = config("TELEGRAM_OFFSET_FILE", default="telegram_offset.json")
+        # webhook mode, Telegram pushes updates to this public url instead of us polling (blank to use polling).
+        # Telegram only delivers to https, the built-in server is plain http on host:port, so the url must point at a
+        # TLS-terminating proxy (nginx, caddy, a tunnel) that forwards to it. webhook mode doesn't start without a secret
+        self.TELEGRAM_WEBHOOK_URL = config("TELEGRAM_WEBHOOK_URL", default="")
+        self.TELEGRAM_WEBHOOK_HOST = config("TELEGRAM_WEBHOOK_HOST", default="127.0.0.1")
+        self.TELEGRAM_WEBHOOK_PORT = config("TELEGRAM_WEBHOOK_PORT", default=8443, cast=int)
+        self.TELEGRAM_WEBHOOK_PATH = config("TELEGRAM_WEBHOOK_PATH", default="/telegram")
+        self.TELEGRAM_WEBHOOK_SECRET = config("TELEGRAM_WEBHOOK_SECRET", default="")
+        # tries to get the bot going (webhook set, polling started) before asking for a restart
+        self.TELEGRAM_INIT_ATTEMPTS = config("TELEGRAM_INIT_ATTEMPTS", default=3, cast=int)
+        # connection pool size of the asyncio bot client
+        self.TELEGRAM_ASYNC_CONNECTIONS = config("TELEGRAM_ASYNC_CONNECTIONS", default=100, cast=int)
@@ -0,0 +1,57 @@
+from threading import Event, Lock
+
+
+class _Call:
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+
+    def __init__(self):
+        # key -> the call in flight, everyone asking the same thing meanwhile waits for its result
+        self.calls = {}
+        self.lock = Lock()
+        self.metrics = {"calls": 0, "shared": 0}
+
+    def do(self, key, func, timeout=None):
+        with self.lock:
+            self.metrics["calls"] += 1
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self.calls[key] = call
+            else:
+                self.metrics["shared"] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"Gave up waiting for the request in flight for \"{key}\".")
+            if call.error:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+
+        except Exception as ex:
+            call.error = ex
+            raise
+
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+    def in_flight(self, key):
+        with self.lock:
+            return key in self.calls
+
+    def get_metrics(self):
+        with self.lock:
+            return dict(self.metrics, in_flight=len(self.calls))
@@ -0,0 +1,48 @@
+import os
+import wikipedia
+import xmltodict
+from http_client import http_get
+from summary_store import PAGE, DISAMBIGUATION
+
+# the lookups skills run in a skill worker process (SKILL_WORKERS), module level functions so they can be pickled.
+# the workers import only this module, not skills_library and its caches and stores
+
+
+def query_wolfram(wolfram_url, app_id, query, deadline=None):
+    # query the Wolfram|Alpha API through the shared http client (pooled connections and timeouts)
+    response = http_get(wolfram_url, deadline=deadline, params={"appid": app_id, "input": query})
+    response.raise_for_status()
+    return xmltodict.parse(response.content)["queryresult"]
+
+
+def wikipedia_lookup(keyword, sentences=2):
+    # (kind, canonical title, summary or the disambiguation options), the title is what the keyword redirected to
+    try:
+        page = wikipedia.page(keyword, auto_suggest=True, redirect=True)
+        return PAGE, page.title, wikipedia.summary(page.title, sentences=sentences, auto_suggest=False)
+
+    except wikipedia.exceptions.DisambiguationError as ex:
+        return DISAMBIGUATION, ex.title, ex.options[:10]
+
+
+def search_files(file_dir, file_name, progress=None):
+    files_found = {'(Files Found)'}
+    found_file_count = 0
+    file_count = 0
+
+    for subdir, dirs, files in os.walk(file_dir):
+        for file_ in files:
+            file_count += 1
+
+            if file_name.lower().strip() in str(file_).lower().strip():
+                found_file_count += 1
+                fn = (os.path.join(subdir, file_).lower().split("\\"))[-1]
+                fname = os.path.join(subdir, file_).lower().replace(file_dir, "..").replace(fn, "")
+
+                files_found.add(f"'{fname}'")
+
+            # announce every 5000th file is done searched
+            if progress and file_count > 0 and ((file_count % 5000) == 0):
+                progress(found_file_count, file_count)
+
+    return files_found, found_file_count, file_count
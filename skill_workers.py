@@ -0,0 +1,212 @@
+import time
+import pickle
+import logging
+import importlib
+import multiprocessing
+from queue import Queue, Empty
+from threading import Thread, Lock
+from settings import Configuration
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+config = Configuration()
+
+
+class SkillWorkerError(Exception):
+    pass
+
+
+class SkillTimeout(SkillWorkerError):
+    pass
+
+
+def _worker_main(conn, preload):
+    # runs in the worker process, import the skills once so the first call doesn't pay for it
+    for module_name in preload:
+        importlib.import_module(module_name)
+
+    # one call at a time, until the assistant closes the pipe
+    while True:
+        try:
+            func, args, kwargs = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        try:
+            result = ("ok", func(*args, **kwargs))
+        except Exception as ex:
+            result = ("error", ex)
+
+        try:
+            # make sure the assistant can unpickle what we send back
+            pickle.loads(pickle.dumps(result))
+        except Exception:
+            result = ("error", SkillWorkerError(f"{type(result[1]).__name__}: {result[1]}"))
+
+        conn.send(result)
+
+
+class SkillWorker:
+
+    def __init__(self, context, preload):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, preload), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def is_alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class SkillWorkerPool:
+
+    def __init__(self, size, preload=()):
+        self.size = size
+        self.preload = tuple(preload)
+        # spawn (the only option on Windows), so the workers don't inherit our threads and locks
+        self.context = multiprocessing.get_context("spawn")
+        self.idle = Queue()
+        self.workers = []
+        self.metrics = {"calls": 0, "errors": 0, "timeouts": 0, "crashes": 0, "respawns": 0}
+        # callers waiting for an idle worker, the queue depth in front of the pool
+        self.waiting = 0
+        self.max_waiting = 0
+        self.lock = Lock()
+        self.stopped = False
+
+    def start(self):
+        self.stopped = False
+        for _ in range(self.size):
+            self.idle.put(self._spawn())
+
+    def stop(self):
+        with self.lock:
+            self.stopped = True
+            workers, self.workers = self.workers, []
+
+        for worker in workers:
+            worker.kill()
+
+    def _spawn(self):
+        worker = SkillWorker(self.context, self.preload)
+        with self.lock:
+            self.workers.append(worker)
+        return worker
+
+    def _respawn(self, worker, reason):
+        # the caller doesn't wait for the kill and the new process, the fresh worker joins the idle ones when it's up
+        with self.lock:
+            self.metrics[reason] += 1
+            self.metrics["respawns"] += 1
+            if worker in self.workers:
+                self.workers.remove(worker)
+
+        respawn_thread = Thread(target=self._replace, args=(worker,))
+        respawn_thread.setDaemon(True)
+        respawn_thread.start()
+
+    def _replace(self, worker):
+        worker.kill()
+        if not self.stopped:
+            self.idle.put(self._spawn())
+
+    def _record(self, key):
+        with self.lock:
+            self.metrics[key] += 1
+
+    def _wait(self, change):
+        with self.lock:
+            self.waiting += change
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def run(self, func, *args, timeout=None, **kwargs):
+        started = time.monotonic()
+        self._record("calls")
+        self._wait(1)
+
+        try:
+            while True:
+                remaining = None if timeout is None else max(0, timeout - (time.monotonic() - started))
+                try:
+                    worker = self.idle.get(timeout=remaining)
+                except Empty:
+                    self._record("timeouts")
+                    raise SkillTimeout(f"All skill workers are busy, \"{func.__name__}\" was not started.")
+
+                if worker.is_alive():
+                    break
+                # died while idle, replace it in the background and take the next one
+                self._respawn(worker, "crashes")
+
+        finally:
+            self._wait(-1)
+
+        try:
+            worker.conn.send((func, args, kwargs))
+
+            remaining = None if timeout is None else max(0, timeout - (time.monotonic() - started))
+            if not worker.conn.poll(remaining):
+                # the skill is hanging, kill the worker and put a fresh one in its place
+                self._respawn(worker, "timeouts")
+                worker = None
+                raise SkillTimeout(f"\"{func.__name__}\" did not finish in {timeout} seconds.")
+
+            status, value = worker.conn.recv()
+
+        except (EOFError, OSError):
+            # the worker died in the middle of the call (crashed skill, killed process)
+            self._respawn(worker, "crashes")
+            worker = None
+            raise SkillWorkerError(f"Skill worker crashed while running \"{func.__name__}\".")
+
+        finally:
+            if worker:
+                self.idle.put(worker)
+
+        if status == "error":
+            self._record("errors")
+            raise value
+
+        return value
+
+    def get_metrics(self):
+        with self.lock:
+            return dict(self.metrics, workers=len(self.workers), idle=self.idle.qsize(), waiting=self.waiting, max_waiting=self.max_waiting)
+
+
+# process isolation is opt-in (SKILL_WORKERS > 0), otherwise skills keep running inline
+pool = SkillWorkerPool(config.SKILL_WORKERS, preload=("skill_lookups",)) if config.SKILL_WORKERS > 0 else None
+
+
+def start_skill_workers():
+    if pool:
+        pool.start()
+
+
+def stop_skill_workers():
+    if pool:
+        pool.stop()
+
+
+def is_isolated():
+    return pool is not None
+
+
+def run_skill(func, *args, timeout=None, **kwargs):
+    # func and its arguments are sent to another process, so they must be picklable (module level functions)
+    if pool is None:
+        return func(*args, **kwargs)
+
+    return pool.run(func, *args, timeout=timeout, **kwargs)
+
+
+def skill_worker_metrics():
+    return pool.get_metrics() if pool else {}
+
+
+register_metrics("skill_workers", skill_worker_metrics)
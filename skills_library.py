@@ -1,24 +1,76 @@
 import os
 import sys
-import requests
+import json
 import subprocess
 import webbrowser
+import requests
 import wikipedia
-import wolframalpha
 import time
 import wmi  # (screen brightness) Windows Management Instrumentation module
+import re
 import linecache
 import logging
-import concurrent.futures as task
-from threading import Thread
-from helper import is_match, get_commands, clean_voice_data, extract_metadata, execute_map
-from urllib.parse import quote
+from helper import is_match, get_commands, clean_voice_data, extract_metadata, execute_map, start_console, in_directory, run_in_directory, start_in_directory
+from urllib.parse import quote, urlparse
 from random import choice
-from datetime import datetime as dt
-from word2number import w2n
+from datetime import datetime as dt, timedelta
 from settings import Configuration
+from http_client import resolve_url, guarded_call, is_reachable
+from skill_workers import run_skill, is_isolated, SkillTimeout
+from task_pool import run_in_background
+from answer_cache import AnswerCache, normalize_query
+from single_flight import SingleFlight
+from quota import QuotaTracker
+from summary_store import SummaryStore, DISAMBIGUATION
+from skill_lookups import query_wolfram, wikipedia_lookup, search_files
+from answer_store import AnswerStore
+from calculator import evaluate, CalculatorError
+from metrics import register_metrics
 
 logger = logging.getLogger(__name__)
+config = Configuration()
+
+# Wolfram|Alpha answers by normalized query, shared by every instance and kept in the warm-state snapshot
+wolfram_cache = AnswerCache()
+# identical Wolfram|Alpha queries in flight at the same time share one request
+wolfram_flight = SingleFlight()
+# monthly calls made with WOLFRAM_APP_ID, also kept in the warm-state snapshot
+wolfram_quota = QuotaTracker("Wolfram|Alpha", config.WOLFRAM_MONTHLY_QUOTA, config.WOLFRAM_QUOTA_RESERVE)
+
+# hit rate and entries, calls used and remaining this month, shared requests, in metrics.json and on the text server's /metrics
+register_metrics("wolfram_cache", wolfram_cache.get_metrics)
+register_metrics("wolfram_quota", wolfram_quota.get_metrics)
+register_metrics("wolfram_flight", wolfram_flight.get_metrics)
+
+# Wikipedia summaries (and what the keywords resolved to) on disk, shared by every instance
+wikipedia_store = SummaryStore(os.path.join(config.ASSISTANT_DIR, config.WIKIPEDIA_CACHE_FILE), config.WIKIPEDIA_CACHE_SIZE)
+register_metrics("wikipedia_store", wikipedia_store.get_metrics)
+
+# every knowledge answer (Wolfram|Alpha, Wikipedia), full-text searchable for when the sources are unreachable
+answer_store = AnswerStore(os.path.join(config.ASSISTANT_DIR, config.ANSWER_STORE_FILE), config.ANSWER_STORE_BATCH)
+register_metrics("answer_store", answer_store.get_metrics)
+
+# questions about the clock and the calendar (normalized), whole phrasings so "who is the president now"
+# or "what day did ww2 end" aren't answered with the time or today's date
+TIME_QUESTION = re.compile(r"\b(?:what time is it|whats the time|what is the time|tell me the time|current time|time right now)\b")
+DATE_QUESTION = re.compile(r"\b(?:what day is it|what day is today|what date is it|whats the date|what is the date|whats today|what is today|todays date|date today)\b")
+
+# results that stay the same the whole day (fun holiday), shared by every instance and kept in the warm-state snapshot
+daily_memo = {}
+# one fun holiday scrape at a time, by date
+fun_holiday_flight = SingleFlight()
+
+
+def close_stores():
+    # on exit, the stores outlive the restarts like the caches (the answer store writes what's still pending first)
+    wikipedia_store.close()
+    answer_store.close()
+
+
+def restore_daily_memo(state):
+    today = dt.now().strftime("%Y-%m-%d")
+    # yesterday's results are no use to us
+    daily_memo.update({name: memo for name, memo in state.items() if memo.get("date") == today})
 
 
 class SkillsLibrary(Configuration):
@@ -82,21 +134,19 @@ class SkillsLibrary(Configuration):
             time_prefix = ["It's", "The time is"]
             return f'{choice(time_prefix)} {dt.now().strftime("%I:%M %p")}'
 
-    def google(self, search_keyword):
+    def google(self, search_keyword, deadline=None):
         result = ""
         # open google iste in web browser and show results
         if search_keyword:
             link = f"https://google.com/search?q={quote(search_keyword.strip())}"
 
-            open_browser_thread = Thread(target=execute_map, args=("open browser", [link],))
-            open_browser_thread.setDaemon(True)
-            open_browser_thread.start()
+            execute_map("open browser", [link])
             result = f"Here's what I found on the web for \"{search_keyword.strip()}\". Opening your web browser...\n"
 
             # let get the redirected url (if possible) from link we have
-            redirect_url = requests.get(link)
+            redirect_url = resolve_url(link, deadline=deadline)
             # send the link to bot
-            self.tts.respond_to_bot(redirect_url.url)
+            self.tts.respond_to_bot(redirect_url)
 
         return result
 
@@ -106,9 +156,7 @@ class SkillsLibrary(Configuration):
         if search_keyword:
             link = f"https://www.youtube.com/results?search_query={quote(search_keyword.strip())}"
 
-            open_browser_thread = Thread(target=execute_map, args=("open browser", [link],))
-            open_browser_thread.setDaemon(True)
-            open_browser_thread.start()
+            execute_map("open browser", [link])
             result = f"I found something on Youtube for \"{search_keyword}\"."
 
             # send the link to bot
@@ -116,31 +164,130 @@ class SkillsLibrary(Configuration):
 
         return result
 
-    def google_maps(self, location):
+    def google_maps(self, location, deadline=None):
         result = ""
         if location:
             link = f"https://google.nl/maps/place/{quote(location.strip())}/&amp;"
             # open a web browser and map
-            open_browser_thread = Thread(target=execute_map, args=("open browser", [link],))
-            open_browser_thread.setDaemon(True)
-            open_browser_thread.start()
+            execute_map("open browser", [link])
             result = f"Here\'s the map location of \"{location.strip()}\". Opening your browser..."
 
             # let get the redirected url (if possible) from link we have
-            redirect_url = requests.get(link)
+            redirect_url = resolve_url(link, deadline=deadline)
             # send the link to bot
-            self.tts.respond_to_bot(redirect_url.url)
+            self.tts.respond_to_bot(redirect_url)
+
+        return result
+
+    def _skill_timeout(self, deadline=None):
+        # a worker is only killed when it hangs, the http timeouts inside it already honour the deadline
+        return (deadline.remaining() + 1) if deadline else self.SKILL_TIMEOUT
+
+    def remember_answer(self, question, answer, source):
+        # only what stays true, yesterday's weather or time is no answer
+        if self._wolfram_query_class(normalize_query(question)) not in ("general", "definition"):
+            return
+
+        if answer_store.record(question, answer, source):
+            run_in_background("answer store", answer_store.flush)
+
+    def recall_answer(self, question):
+        # the closest question answered before, said as what it is
+        stored = answer_store.search(question)
+        if stored:
+            answer, source, answered_at = stored
+            return f"I can't reach my sources right now, but here's a cached answer from {source} ({dt.fromtimestamp(answered_at).strftime('%B %d, %Y')}). {answer}"
+        return ""
+
+    def sources_unreachable(self):
+        return not (is_reachable(urlparse(self.WOLFRAM_URL).netloc) and is_reachable("en.wikipedia.org"))
+
+    def _wolfram_query_class(self, query):
+        words = set(query.split())
+
+        if words & {"sunrise", "sunset"} or "this day in history" in query:
+            return "history"
+        if TIME_QUESTION.search(query):
+            return "time"
+        if words & {"weather", "temperature", "rain", "precipitation", "forecast"}:
+            return "weather"
+        if DATE_QUESTION.search(query):
+            return "date"
+        if words & {"define", "definition", "meaning", "means", "synonym", "synonyms"}:
+            return "definition"
+        return "general"
+
+    def _wolfram_ttl(self, query_class):
+        # how long an answer stays true depends on what was asked
+        now = dt.now()
+        until_midnight = (dt.combine(now.date() + timedelta(days=1), dt.min.time()) - now).total_seconds()
+
+        if query_class == "time":
+            return 0
+        if query_class in ("history", "date"):
+            return until_midnight
+        if query_class == "weather":
+            return self.WOLFRAM_WEATHER_TTL
+        if query_class == "definition":
+            return self.WOLFRAM_DEFINITION_TTL
+        return self.WOLFRAM_CACHE_TTL
+
+    def _wolfram_fallback(self, query_class, voice_data):
+        # cheaper answers while the quota is low, or nothing so wikipedia/google get to answer
+        if query_class == "time":
+            return self.ask_time(voice_data)
+        if query_class == "date":
+            return f'Today is {dt.now().strftime("%A, %B %d, %Y")}.'
+        return ""
 
+    def wolfram_query(self, query, deadline=None):
+        key = normalize_query(query)
+        result = wolfram_cache.get(key)
+        if result is not None:
+            return result
+
+        # keep the rest of the quota for the weather, nothing else we have can answer it
+        query_class = self._wolfram_query_class(key)
+        if wolfram_quota.is_exhausted() or (wolfram_quota.is_low() and query_class != "weather"):
+            return None
+
+        # the briefing and a question may ask for the weather at the same time, only one of them pays for it
+        return wolfram_flight.do(key, lambda: self._fetch_wolfram(query, key, query_class, deadline), timeout=self._skill_timeout(deadline))
+
+    def _fetch_wolfram(self, query, key, query_class, deadline):
+        # answered while we were waiting our turn
+        result = wolfram_cache.get(key)
+        if result is not None:
+            return result
+
+        wolfram_quota.spend()
+        if is_isolated():
+            # the worker's http client has its own breaker and metrics, ours must see the failures too
+            result = guarded_call(urlparse(self.WOLFRAM_URL).netloc, run_skill, query_wolfram, self.WOLFRAM_URL, self.WOLFRAM_APP_ID, query, deadline=deadline,
+                                  timeout=self._skill_timeout(deadline), failure_types=(requests.RequestException, SkillTimeout))
+        else:
+            # inline, the shared http client already guards and counts the request
+            result = query_wolfram(self.WOLFRAM_URL, self.WOLFRAM_APP_ID, query, deadline=deadline)
+        # only the answers, a failed query may work the next time
+        if result.get("@success") == "true":
+            wolfram_cache.put(key, result, self._wolfram_ttl(query_class))
         return result
 
-    def wolfram_search(self, voice_data):
+    def clear_answer_cache(self, topic=""):
+        count = wolfram_cache.invalidate(topic)
+        about = f" about \"{topic}\"" if topic else ""
+        return f"{choice(self._get_commands('acknowledge response'))} I forgot {count} cached answer{'' if count == 1 else 's'}{about}."
+
+    def wolfram_search(self, voice_data, deadline=None):
         response = ""
         meta_data = ""
         parts_of_speech = self._get_commands("parts of speech")
 
-        try:
-            client = wolframalpha.Client(self.WOLFRAM_APP_ID)
+        # no time left to wait for Wolfram|Alpha, let the other skills answer
+        if deadline and not deadline.allows("wolfram_search"):
+            return response
 
+        try:
             def _resolveListOrDict(value):
                 if isinstance(value, list):
                     return value[0]["plaintext"]
@@ -241,7 +388,9 @@ class SkillsLibrary(Configuration):
                 is_weather_report = True
 
             # send query to Wolfram Alpha
-            wolframAlpha = client.query(voice_data)
+            wolframAlpha = self.wolfram_query(voice_data, deadline)
+            if wolframAlpha is None:
+                return self._wolfram_fallback(self._wolfram_query_class(normalize_query(voice_data)), voice_data)
 
             # check if we have a successful result
             if wolframAlpha["@success"] == "true":
@@ -411,14 +560,34 @@ class SkillsLibrary(Configuration):
         # if no answers found return a blank response
         return response
 
-    def wikipedia_search(self, wiki_keyword, voice_data):
+    def _wikipedia_lookup(self, keyword, deadline=None):
+        # fails fast while Wikipedia is unreachable
+        kind, title, content = guarded_call("en.wikipedia.org", run_skill, wikipedia_lookup, keyword, sentences=2,
+                                            timeout=self._skill_timeout(deadline), failure_types=(requests.RequestException, SkillTimeout))
+        wikipedia_store.put(keyword, title, kind, content)
+        return kind, title, content
+
+    def wikipedia_search(self, wiki_keyword, voice_data, deadline=None):
         result = ""
+
         if wiki_keyword:
             try:
-                summary = wikipedia.summary(wiki_keyword.strip(), sentences=2)
+                lookup = wikipedia_store.get(wiki_keyword.strip())
+                if lookup is None:
+                    # the wikipedia library can't take a timeout, only call it if there's a reasonable time left
+                    if deadline and not deadline.allows("wikipedia_search", self.WIKIPEDIA_MIN_BUDGET):
+                        return result
+                    lookup = self._wikipedia_lookup(wiki_keyword.strip(), deadline)
+
+                kind, title, summary = lookup
+                if kind == DISAMBIGUATION:
+                    # the same answer the wikipedia library would give us
+                    raise wikipedia.exceptions.DisambiguationError(title, summary)
+
                 if len(summary.split(" ")) > 30 or len(summary.split(".")[0].split(" ")) > 30:
                     summary = summary.split(".")[0] + "."
 
+                self.remember_answer(voice_data, summary, "Wikipedia")
                 return summary
 
             except wikipedia.exceptions.WikipediaException:
@@ -430,124 +599,56 @@ class SkillsLibrary(Configuration):
                 else:
                     result = "I don't know what that is but,"
 
-                return f"{result} {self.google(wiki_keyword.strip())}"
+                return f"{result} {self.google(wiki_keyword.strip(), deadline)}"
 
             except Exception:
                 self.Log("Wikipedia Search Skill Error.")
 
         return result
 
-    def calculator(self, voice_data):
-        operator = ""
-        number1 = 0
-        percentage = 0
-        answer = None
-        equation = ""
-
-        try:
-            # evaluate if there are square root or cube root questions, replace with single word
-            evaluated_voice_data = voice_data.replace(",", "").replace("power of", "power#of").replace(
-                "square root", "square#root").replace("cube root", "cube#root").split(" ")
-
-            for word in evaluated_voice_data:
-                if is_match(word, ["+", "plus", "add"]):
-                    operator = " + " if not word.replace("+",
-                                                         "").isdigit() else word
-                    equation += operator
-                elif is_match(word, ["-", "minus", "subtract"]):
-                    operator = " - " if not word.replace("-",
-                                                         "").isdigit() else word
-                    equation += operator
-                elif is_match(word, ["x", "times", "multiply", "multiplied"]):
-                    operator = " * "
-                    equation += operator
-                elif is_match(word, ["/", "divide", "divided"]):
-                    operator = " / "
-                    equation += operator
-                elif is_match(word, ["^", "power#of"]):
-                    operator = " ^ "
-                    equation += operator
-                elif is_match(word, ["square#root"]):
-                    equation += "x2"
-                elif is_match(word, ["cube#root"]):
-                    equation += "x3"
-                elif is_match(word, ["percent", "%"]):
-                    operator = "%"
-                    if not word.isdigit() and "%" in word:
-                        equation += f"{word} of "
-                        percentage = w2n.word_to_num(word.replace("%", ""))
-                    else:
-                        equation += "% of "
-                        percentage = number1
-                    number1 = 0
-                elif is_match(word, ["dot", "point", "."]):
-                    equation += word
-
-                # try to convert words to numbers
-                elif word.isdigit() or is_match(word, ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "zero"]):
-                    # build the equation
-                    equation += str(w2n.word_to_num(word)).replace(" ", "")
-
-                    # store number value for special equations (percentage, square root, cube root)
-                    if percentage or ("x2" in equation) or ("x3" in equation):
-                        number1 = word
-
-            if percentage and int(number1) > 0:
-                equation = f"{percentage}*.01*{number1}"
-                # evaluate percentage equation
-                answer = float(eval(equation))
-                # create a readable equation
-                equation = f"{percentage}% of {number1}"
-
-            # no percentage computation was made,
-            # just return equivalent value of percent
-            if (answer is None) and percentage:
-                return f"{percentage}% is {percentage * .01}"
-
-            if "x2" in equation:
-                equation = f"{number1}**(1./2.)"
-            elif "x3" in equation:
-                equation = f"{number1}**(1./3.)"
-            elif "^" in equation:
-                # can't evaluate
-                return ""
-
-            if (answer is None) and equation:
-                try:
-                    # evaluate the equation made
-                    answer = eval(equation.replace(",", ""))
-                except ZeroDivisionError:
-                    return choice(["The answer is somwhere between infinity, negative infinity, and undefined.", "The answer is undefined."])
-                except Exception:
-                    self.Log(
-                        "Calculator Skill Exception (handled).", logging.INFO)
-                    return ""
-
-            if answer is not None:
-                with_decimal_point = float('{:.02f}'.format(answer))
+    def prefetch_wikipedia(self, texts, limit=10):
+        # names in the news (capitalized words in a row, e.g. "World Health Organization"), the next "who is" is answered locally
+        titles = []
+        for text in texts:
+            for title in re.findall(r"\b[A-Z][\w'.-]+(?:\s+(?:of\s+|the\s+|de\s+)?[A-Z][\w'.-]+)+", text):
+                if title not in titles and not wikipedia_store.has(title):
+                    titles.append(title)
 
-                # check answer for decimal places,
-                # convert to whole number if decimal point value is ".00"
-                positive_float = int(
-                    (str(with_decimal_point).split('.'))[1]) > 0
+        for title in titles[:limit]:
+            try:
+                self._wikipedia_lookup(title)
 
-                format_answer = with_decimal_point if positive_float else int(
-                    answer)
+            except Exception:
+                # not on wikipedia (or it's unreachable), it's just a prefetch
+                pass
 
-                # bring back the readable format of square root and cube root
-                equation = equation.replace(f"{number1}**(1./2.)", f"square root of {number1}").replace(
-                    f"{number1}**(1./3.)", f"cube root of {number1}")
+    def calculator(self, voice_data):
+        try:
+            # tokenized and evaluated in one pass (powers, roots, percentages, parentheses), no eval
+            answer, equation = evaluate(voice_data)
 
-                equation = [equation, "The answer"]
+        except ZeroDivisionError:
+            return choice(["The answer is somwhere between infinity, negative infinity, and undefined.", "The answer is undefined."])
 
-                return f"{choice(equation)} is {'approximately ' if positive_float else ''}{format_answer}"
-            else:
-                return ""
+        except CalculatorError:
+            self.Log("Calculator Skill Exception (handled).", logging.INFO)
+            return ""
 
         except Exception:
             self.Log("Calculator Skill Error.")
             return ""
 
+        with_decimal_point = float('{:.02f}'.format(answer))
+
+        # check answer for decimal places,
+        # convert to whole number if decimal point value is ".00"
+        positive_float = with_decimal_point != int(with_decimal_point)
+        format_answer = with_decimal_point if positive_float else int(with_decimal_point)
+
+        equation = [equation, "The answer"]
+
+        return f"{choice(equation)} is {'approximately ' if positive_float else ''}{format_answer}"
+
     def open_application(self, voice_data):
         confirmation = ""
         app_names = []
@@ -641,30 +742,18 @@ class SkillsLibrary(Configuration):
 
                 elif is_match(app, ["newsfeed", "news"]):
                     app_names.append("Newsfeed Ticker")
-                    # change directory to NewsTicker library
-                    os.chdir(self.NEWS_DIR)
-                    # execute batch file that will open Newsfeed on a newo console window
-                    os.system('start cmd /k \"start News Ticker.bat\"')
-                    # get back to virtual assistant directory after command execution
-                    os.chdir(self.ASSISTANT_DIR)
+                    # execute batch file (in NewsTicker library) that will open Newsfeed on a newo console window
+                    start_console('"start News Ticker.bat"', self.NEWS_DIR)
 
                 elif is_match(app, ["wi-fi-monitoring", "wi-fi-manager", "wifi-manager"]):
                     app_names.append("Wi-Fi Manager")
-                    # change directory to Wi-Fi manager library
-                    os.chdir(self.UTILS_DIR)
-                    # execute batch file that will open Wi-Fi manager on a newo console window
-                    os.system('start cmd /k \"wifi manager.bat\"')
-                    # get back to virtual assistant directory after command execution
-                    os.chdir(self.ASSISTANT_DIR)
+                    # execute batch file (in Wi-Fi manager library) that will open Wi-Fi manager on a newo console window
+                    start_console('"wifi manager.bat"', self.UTILS_DIR)
 
                 elif is_match(app, ["pse-ticker", "pse"]):
                     app_names.append("Philippine Stock Exchange Ticker")
-                    # change directory to PSE library resides
-                    os.chdir(self.PSE_DIR)
-                    # open PSE ticker in new window
-                    os.system('start cmd /k \"start_PSE.bat\"')
-                    # get back to virtual assistant directory after command execution
-                    os.chdir(self.ASSISTANT_DIR)
+                    # open PSE ticker in new window, from the directory PSE library resides
+                    start_console('"start_PSE.bat"', self.PSE_DIR)
 
                 elif is_match(app, ["youtube", "google", "netflix", "github", "facebook", "twitter", "instagram", "wikipedia"]):
                     if app == "youtube":
@@ -694,20 +783,14 @@ class SkillsLibrary(Configuration):
 
             # launch local applications using python's os.system class
             if len(app_commands) > 0:
-                open_app_thread = Thread(
-                    target=execute_map, args=("open system", app_commands,))
-                open_app_thread.setDaemon(True)
-                open_app_thread.start()
+                execute_map("open system", app_commands)
 
             # open the webapp in web browser
             if len(urls) > 0:
-                open_browser_thread = Thread(
-                    target=execute_map, args=("open browser", urls,))
-                open_browser_thread.setDaemon(True)
-                open_browser_thread.start()
-                # send the links to bot
-                with task.ThreadPoolExecutor() as exec:
-                    exec.map(self.tts.respond_to_bot, urls)
+                execute_map("open browser", urls)
+                # send the links to bot (queued, the bot's sender thread delivers them)
+                for url in urls:
+                    self.tts.respond_to_bot(url)
 
             if len(app_names) > 0:
                 alternate_responses = self._get_commands("acknowledge response")
@@ -737,7 +820,6 @@ class SkillsLibrary(Configuration):
                 else:
                     files_found = {'(Files Found)'}
                     found_file_count = 0
-                    file_count = 0
 
                     # confirm if the user, is looking for files/documents
                     confirm = self.tts.listen_to_audio(
@@ -747,30 +829,20 @@ class SkillsLibrary(Configuration):
                         self.tts.speak(
                             f"\nSearching directories for files with \"{file_name}\"")
 
+                        def _progress(found_file_count, file_count):
+                            self.print(
+                                f"{self.assistant_name}: so far, I found {found_file_count} o/f {file_count}")
+                            self.tts.speak("Searching...")
+
                         try:
-                            # start the file search
-                            for subdir, dirs, files in os.walk(self.FILE_DIR):
-                                for file_ in files:
-                                    isFileFound = False
-                                    file_count += 1
-
-                                    if file_name.lower().strip() in str(file_).lower().strip():
-                                        isFileFound = True
-                                    if isFileFound:
-                                        fname = ""
-                                        found_file_count += 1
-                                        fn = (os.path.join(
-                                            subdir, file_).lower().split("\\"))[-1]
-                                        fname = os.path.join(subdir, file_).lower().replace(
-                                            self.FILE_DIR, "..").replace(fn, "")
-
-                                        files_found.add(f"'{fname}'")
-
-                                    # announce every 5000th file is done searched
-                                    if file_count > 0 and ((file_count % 5000) == 0):
-                                        self.print(
-                                            f"{self.assistant_name}: so far, I found {found_file_count} o/f {file_count}")
-                                        self.tts.speak("Searching...")
+                            # start the file search, in a worker process it can't report progress,
+                            # but a search that takes too long is killed instead of blocking the assistant
+                            files_found, found_file_count, _ = run_skill(search_files, self.FILE_DIR, file_name,
+                                                                         progress=(None if is_isolated() else _progress), timeout=self.FILE_SEARCH_TIMEOUT)
+
+                        except SkillTimeout:
+                            self.Log("Find File Skill Timeout (handled)", logging.INFO)
+                            self.tts.speak("Search is taking too long, I stopped it...")
 
                         except KeyboardInterrupt:
                             self.Log(
@@ -874,13 +946,9 @@ class SkillsLibrary(Configuration):
             self.Log("Wallpaper Skill Error.")
 
     def initiate_new_project(self, lang="Python", proj_name="NewPythonProject", mode="g"):
-        # navigate to the ProjectGitInitAutomation directory - contains the libraries
-        # to automate creation of project, it pushes the initial commit files to Github if possible
-        os.chdir(self.INIT_PROJ_DIR)
-        # batch file to execute project initiation in new window
-        os.system(f'start cmd /k \"create.bat\" {lang} {proj_name} {mode}')
-        # get back to virtual assistant directory after command execution
-        os.chdir(self.ASSISTANT_DIR)
+        # batch file to execute project initiation in new window, from the ProjectGitInitAutomation directory -
+        # contains the libraries to automate creation of project, it pushes the initial commit files to Github if possible
+        start_console(f'\"create.bat\" {lang} {proj_name} {mode}', self.INIT_PROJ_DIR)
         return f"The new {lang} project should open in Visual Studio Code when done..."
 
     def play_music(self, voice_data):
@@ -897,64 +965,62 @@ class SkillsLibrary(Configuration):
             import sys
             sys.path.append(self.UTILS_DIR)
             from musicplayer import MusicPlayer
-            mp = MusicPlayer()
-
-            # change the directory to location of batch file to execute
-            os.chdir(self.UTILS_DIR)
-
-            music_word_found = True if is_match(
-                voice_data, ["music", "songs"]) else False
-            meta_data = voice_data.lower().replace("&", "and").replace(
-                "music", "").replace("songs", "").strip()
-
-            if meta_data == "":
-                # mode = "compact"
-                alternate_responses = self._get_commands("acknowledge response")
-                response = f"{choice(alternate_responses)} Playing all songs{', shuffled' if shuffle == 'True' else '...'}"
-                songWasFound = True
 
-            elif meta_data and "by" in meta_data.split(" ") and meta_data.find("by") > 0 and len(meta_data.split()) >= 3:
-                option = '"play by"'
+            # the music player reads its files relative to its own directory
+            with in_directory(self.UTILS_DIR):
+                mp = MusicPlayer()
 
-                by_idx = meta_data.find("by")
-                title = meta_data[:(by_idx - 1)].strip().capitalize()
-                artist = meta_data[(by_idx + 3):].strip().capitalize()
+                music_word_found = True if is_match(
+                    voice_data, ["music", "songs"]) else False
+                meta_data = voice_data.lower().replace("&", "and").replace(
+                    "music", "").replace("songs", "").strip()
 
-                if mp.search_song_by(title, artist, title):
+                if meta_data == "":
+                    # mode = "compact"
+                    alternate_responses = self._get_commands("acknowledge response")
+                    response = f"{choice(alternate_responses)} Playing all songs{', shuffled' if shuffle == 'True' else '...'}"
                     songWasFound = True
-                    artist = f'"{artist}"'
-                    genre = title
 
-                    alternate_responses = self._get_commands("acknowledge response")
-                    response = f"{choice(alternate_responses)} Playing \"{title}\" by {artist}..."
-                else:
-                    response = f"I couldn't find \"{title}\" in your music."
+                elif meta_data and "by" in meta_data.split(" ") and meta_data.find("by") > 0 and len(meta_data.split()) >= 3:
+                    option = '"play by"'
 
-            elif meta_data:
-                option = '"play by"'
-                title = f'"{meta_data}"'
-                artist = f'"{meta_data}"'
-                genre = f'"{meta_data}"'
+                    by_idx = meta_data.find("by")
+                    title = meta_data[:(by_idx - 1)].strip().capitalize()
+                    artist = meta_data[(by_idx + 3):].strip().capitalize()
 
-                mp.title = meta_data
-                mp.artist = meta_data
-                mp.genre = meta_data
+                    if mp.search_song_by(title, artist, title):
+                        songWasFound = True
+                        artist = f'"{artist}"'
+                        genre = title
 
-                if mp.search_song_by(meta_data, meta_data, meta_data):
-                    songWasFound = True
-                    alternate_responses = self._get_commands("acknowledge response")
-                    response = f"{choice(alternate_responses)} Now playing \"{meta_data.capitalize()}\" {'music...' if music_word_found else '...'}"
-                else:
-                    response = f"I couldn't find \"{meta_data.capitalize()}\" in your music."
+                        alternate_responses = self._get_commands("acknowledge response")
+                        response = f"{choice(alternate_responses)} Playing \"{title}\" by {artist}..."
+                    else:
+                        response = f"I couldn't find \"{title}\" in your music."
+
+                elif meta_data:
+                    option = '"play by"'
+                    title = f'"{meta_data}"'
+                    artist = f'"{meta_data}"'
+                    genre = f'"{meta_data}"'
+
+                    mp.title = meta_data
+                    mp.artist = meta_data
+                    mp.genre = meta_data
+
+                    if mp.search_song_by(meta_data, meta_data, meta_data):
+                        songWasFound = True
+                        alternate_responses = self._get_commands("acknowledge response")
+                        response = f"{choice(alternate_responses)} Now playing \"{meta_data.capitalize()}\" {'music...' if music_word_found else '...'}"
+                    else:
+                        response = f"I couldn't find \"{meta_data.capitalize()}\" in your music."
+
+                if songWasFound:
+                    mp.player_status("close")
 
             if songWasFound:
-                mp.player_status("close")
                 # batch file to play some music in new window
-                os.system(
-                    f'start cmd /k "play_some_music.bat {option} {shuffle} {mode} {title} {artist} {genre}"')
-
-            # get back to virtual assistant directory
-            os.chdir(self.ASSISTANT_DIR)
+                start_console(f'"play_some_music.bat {option} {shuffle} {mode} {title} {artist} {genre}"', self.UTILS_DIR)
 
             return response
 
@@ -967,14 +1033,10 @@ class SkillsLibrary(Configuration):
             import sys
             sys.path.append(self.UTILS_DIR)
             from musicplayer import MusicPlayer
-            mp = MusicPlayer()
-            # change the directory to location of batch file to execute
-            os.chdir(self.UTILS_DIR)
-
-            mp.music_player_volume(volume)
-
-            # get back to virtual assistant directory
-            os.chdir(self.ASSISTANT_DIR)
+            # the music player reads its files relative to its own directory
+            with in_directory(self.UTILS_DIR):
+                mp = MusicPlayer()
+                mp.music_player_volume(volume)
 
         except Exception:
             self.Log("Music Volume Skill Error.")
@@ -1020,17 +1082,15 @@ class SkillsLibrary(Configuration):
             sys.path.append(self.NEWS_DIR)
             from NewsScraper import NewsTicker
 
-            # change the directory to location of batch file to execute
-            os.chdir(self.NEWS_DIR)
-            news = NewsTicker()
+            # the news scraper reads its files relative to its own directory when it's built,
+            # the fetching is network only and doesn't need the directory
+            with in_directory(self.NEWS_DIR):
+                news = NewsTicker()
 
             # execute daemon to fetch breaking news in background
             news.fetch_news()
             news.run_breaking_news_daemon()
 
-            # get back to virtual assistant directory
-            os.chdir(self.ASSISTANT_DIR)
-
             return news
 
         except Exception:
@@ -1040,33 +1100,43 @@ class SkillsLibrary(Configuration):
     def toast_notification(self, title, message, duration=600):
 
         try:
-            import sys
-            sys.path.append(self.UTILS_DIR)
-            from send_toast import ToastMessage
-            notification = ToastMessage()
-            # change the directory to location of batch file to execute
-            os.chdir(self.UTILS_DIR)
+            # the toast library reads its files relative to its own directory and shows the toast until it's
+            # dismissed, so it runs in its own process started there, and we don't wait for it
+            start_in_directory(self.UTILS_DIR, "from send_toast import ToastMessage\n"
+                                               f"ToastMessage().send_toast({title!r}, {message!r}, duration={duration!r})")
 
-            notification.send_toast(title, message, duration=duration)
             self.tts.respond_to_bot(f"‼️ {title} ‼️")
             self.tts.respond_to_bot(message)
 
-            # get back to virtual assistant directory
-            os.chdir(self.ASSISTANT_DIR)
-
         except Exception:
             self.Log("Toast Notification Skill Error.")
 
-    def fun_holiday(self):
+    def fun_holiday(self, cached_only=False):
+        today = dt.now().strftime("%Y-%m-%d")
+        memo = daily_memo.get("fun_holiday")
+        if memo and memo["date"] == today:
+            return tuple(memo["result"])
+
+        if cached_only:
+            # not fetched yet today (it's prefetched after midnight), don't make the question wait for the scraper
+            if not fun_holiday_flight.in_flight(today):
+                run_in_background("fun holiday", self.fun_holiday)
+            return "", "", ""
+
+        return fun_holiday_flight.do(today, lambda: self._fetch_fun_holiday(today))
+
+    def _fetch_fun_holiday(self, today):
+        # fetched while we were waiting for the one in flight
+        memo = daily_memo.get("fun_holiday")
+        if memo and memo["date"] == today:
+            return tuple(memo["result"])
+
         try:
-            import sys
-            sys.path.append(self.NEWS_DIR)
-            from FunHolidays import FunHoliday
-            fh = FunHoliday()
-            # change the directory to location of batch file to execute
-            os.chdir(self.NEWS_DIR)
+            # the fun holiday scraper reads its files relative to its own directory, it runs in its own
+            # process started there so the scrape doesn't hold the working directory
+            result = json.loads(run_in_directory(self.NEWS_DIR, "import json\nfrom FunHolidays import FunHoliday\n"
+                                                                "print(json.dumps(FunHoliday().get_fun_holiday()))", timeout=self.FUN_HOLIDAY_TIMEOUT))
 
-            result = fh.get_fun_holiday()
             if result["success"] == "true":
                 holiday = result["holiday"]
 
@@ -1074,16 +1144,14 @@ class SkillsLibrary(Configuration):
                 message = holiday["heading"]
                 did_you_know = f'Did you know. {holiday["did you know"]}'
 
+                daily_memo["fun_holiday"] = {"date": today, "result": [title, message, did_you_know]}
                 return title, message, did_you_know
 
-            # get back to virtual assistant directory
-            os.chdir(self.ASSISTANT_DIR)
-
         except Exception:
             self.Log("Fun Holiday Skill Error.")
 
+        return "", "", ""
+
     def system_volume(self, vol):
-        # get back to virtual assistant directory after command execution
-        os.chdir(self.ASSISTANT_DIR)
-        # execute batch file that will open Newsfeed on a newo console window
-        os.system(f'start cmd /k "set_system_volume.bat {vol}"')
+        # execute batch file (in virtual assistant directory) that will set the system volume on a new console window
+        start_console(f'"set_system_volume.bat {vol}"', self.ASSISTANT_DIR)
@@ -0,0 +1,61 @@
+import os
+import json
+import logging
+from threading import Lock
+
+logger = logging.getLogger(__name__)
+
+
+class Snapshot:
+
+    def __init__(self, snapshot_file):
+        self.snapshot_file = snapshot_file
+        # name -> function returning the component's state (json serializable)
+        self.providers = {}
+        self.state = {}
+        self.lock = Lock()
+        self.load()
+
+    def load(self):
+        try:
+            if os.path.isfile(self.snapshot_file):
+                with open(self.snapshot_file, "r", encoding="utf-8") as fl:
+                    self.state = json.load(fl)
+
+        except Exception:
+            # a broken snapshot only costs us a cold start
+            logger.exception("Error while loading the warm-state snapshot.")
+            self.state = {}
+
+    def register(self, name, save, restore):
+        # every component provides its own state, and gets it back right away from the last snapshot
+        with self.lock:
+            self.providers[name] = save
+            state = self.state.get(name)
+
+        if state is not None:
+            try:
+                restore(state)
+
+            except Exception:
+                logger.exception(f"Error while restoring \"{name}\" from the warm-state snapshot.")
+
+    def save(self):
+        with self.lock:
+            for name, save in self.providers.items():
+                try:
+                    self.state[name] = save()
+
+                except Exception:
+                    # keep the state of the last good snapshot for this component
+                    logger.exception(f"Error while taking the \"{name}\" snapshot.")
+
+            try:
+                # write to a temporary file first, so a crash never leaves a half written snapshot
+                temp_file = f"{self.snapshot_file}.tmp"
+                with open(temp_file, "w", encoding="utf-8") as fl:
+                    json.dump(self.state, fl, separators=(",", ":"))
+                os.replace(temp_file, self.snapshot_file)
+
+            except Exception:
+                logger.exception("Error while saving the warm-state snapshot.")
@@ -0,0 +1,90 @@
+import json
+import time
+import zlib
+import sqlite3
+import logging
+from threading import Lock
+from answer_cache import normalize_query
+
+logger = logging.getLogger(__name__)
+
+# what a title resolved to
+PAGE = "page"
+DISAMBIGUATION = "disambiguation"
+
+
+class SummaryStore:
+
+    def __init__(self, db_file, max_bytes=(20 * 1024 * 1024)):
+        # summaries on disk by canonical title, compressed, the least recently used go first when it's full
+        self.max_bytes = max_bytes
+        self.metrics = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self.lock = Lock()
+        self.db = sqlite3.connect(db_file, check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS summaries (
+                title TEXT PRIMARY KEY, kind TEXT NOT NULL, content BLOB NOT NULL,
+                size INTEGER NOT NULL, fetched_at REAL NOT NULL, used_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS aliases (
+                alias TEXT PRIMARY KEY, title TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS summaries_used_at ON summaries (used_at);
+        """)
+        self.db.commit()
+
+    def get(self, keyword):
+        # (kind, title, summary or disambiguation options), or None if we never looked it up
+        alias = normalize_query(keyword)
+        with self.lock:
+            row = self.db.execute("SELECT s.title, s.kind, s.content FROM aliases a JOIN summaries s ON s.title = a.title WHERE a.alias = ?", (alias,)).fetchone()
+            if row is None:
+                self.metrics["misses"] += 1
+                return None
+
+            self.db.execute("UPDATE summaries SET used_at = ? WHERE title = ?", (time.time(), row[0]))
+            self.db.commit()
+            self.metrics["hits"] += 1
+
+        content = zlib.decompress(row[2]).decode("utf8")
+        return row[1], row[0], (json.loads(content) if row[1] == DISAMBIGUATION else content)
+
+    def put(self, keyword, title, kind, content):
+        # keyword -> title is kept too (redirects, "who is obama" -> "Barack Obama"), so the next lookup skips the resolution
+        blob = zlib.compress((json.dumps(content) if kind == DISAMBIGUATION else content).encode("utf8"))
+        now = time.time()
+
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO summaries (title, kind, content, size, fetched_at, used_at) VALUES (?, ?, ?, ?, ?, ?)",
+                            (title, kind, blob, len(blob), now, now))
+            for alias in {normalize_query(keyword), normalize_query(title)}:
+                self.db.execute("INSERT OR REPLACE INTO aliases (alias, title) VALUES (?, ?)", (alias, title))
+            self.metrics["stores"] += 1
+            self._evict()
+            self.db.commit()
+
+    def has(self, keyword):
+        with self.lock:
+            return self.db.execute("SELECT 1 FROM aliases WHERE alias = ?", (normalize_query(keyword),)).fetchone() is not None
+
+    def _evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # drop the least recently used until we're a tenth under the limit, so we don't evict on every put
+        for title, size in self.db.execute("SELECT title, size FROM summaries ORDER BY used_at").fetchall():
+            if total <= self.max_bytes * .9:
+                break
+            self.db.execute("DELETE FROM summaries WHERE title = ?", (title,))
+            self.db.execute("DELETE FROM aliases WHERE title = ?", (title,))
+            total -= size
+            self.metrics["evictions"] += 1
+
+    def get_metrics(self):
+        with self.lock:
+            entries, size = self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries").fetchone()
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return dict(self.metrics, entries=entries, bytes=size, hit_rate=(self.metrics["hits"] / lookups if lookups else 0.0))
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,85 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock, BoundedSemaphore
+from settings import Configuration
+from metrics import register_metrics
+
+logger = logging.getLogger(__name__)
+config = Configuration()
+
+
+class TaskPool:
+
+    def __init__(self, max_workers, max_queued):
+        # one long-lived pool for every fire-and-forget task (open browser, launch apps, etc.)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        # bounded, a task that doesn't fit is dropped instead of piling up behind a stuck one
+        self.slots = BoundedSemaphore(max_workers + max_queued)
+        self.metrics = {}
+        self.metrics_lock = Lock()
+        self.closed = False
+
+    def _record(self, category, **changes):
+        with self.metrics_lock:
+            category_metrics = self.metrics.setdefault(category, {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "queued": 0, "running": 0, "max_queued": 0})
+            for key, change in changes.items():
+                category_metrics[key] += change
+            category_metrics["max_queued"] = max(category_metrics["max_queued"], category_metrics["queued"])
+
+    def submit(self, category, func, *args, **kwargs):
+        if self.closed or not self.slots.acquire(blocking=False):
+            self._record(category, rejected=1)
+            logger.warning(f"Task pool is full or closed, dropped a \"{category}\" task.")
+            return None
+
+        self._record(category, submitted=1, queued=1)
+        try:
+            return self.executor.submit(self._run, category, func, args, kwargs)
+
+        except RuntimeError:
+            # shut down in the meantime
+            self.slots.release()
+            self._record(category, queued=-1, submitted=-1, rejected=1)
+            return None
+
+    def _run(self, category, func, args, kwargs):
+        self._record(category, queued=-1, running=1)
+        try:
+            result = func(*args, **kwargs)
+            self._record(category, completed=1)
+            return result
+
+        except Exception:
+            self._record(category, failed=1)
+            logger.exception(f"Error while running a \"{category}\" task.")
+
+        finally:
+            self._record(category, running=-1)
+            self.slots.release()
+
+    def shutdown(self, wait=True):
+        # let the running tasks finish, drop the ones still waiting
+        self.closed = True
+        self.executor.shutdown(wait=wait, cancel_futures=True)
+
+    def get_metrics(self):
+        with self.metrics_lock:
+            return {category: dict(category_metrics) for category, category_metrics in self.metrics.items()}
+
+
+tasks = TaskPool(config.TASK_WORKERS, config.TASK_QUEUE_SIZE)
+
+
+def run_in_background(category, func, *args, **kwargs):
+    return tasks.submit(category, func, *args, **kwargs)
+
+
+def task_metrics():
+    return tasks.get_metrics()
+
+
+register_metrics("tasks", task_metrics)
+
+
+def shutdown_tasks(wait=True):
+    tasks.shutdown(wait)
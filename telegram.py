@@ -1,9 +1,40 @@
+import os
 import json
-import requests
 import time
 import urllib
-from threading import Thread
+from queue import Queue, Empty, Full
+from threading import Thread, Lock
 from settings import Configuration
+from http_client import http_get
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+
+class TokenBucket:
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        self.lock = Lock()
+
+    def consume(self):
+        # block until a token is available, then take it
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + ((now - self.last_refill) * self.rate))
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait_time = (1 - self.tokens) / self.rate
+
+            time.sleep(wait_time)
 
 
 class TelegramBot(Configuration):
@@ -12,19 +43,35 @@ class TelegramBot(Configuration):
         super().__init__()
         self.url = f"{self.TELEGRAM_URL}{self.TELEGRAM_TOKEN}/"
         self.last_update_id = None
-        self.last_command = None
+        # every received command is queued in order, consumers block on this queue
+        self.commands = Queue()
+        # received but not yet handled commands, persisted together with the handled offset
+        self.pending_commands = {}
+        self.journal_lock = Lock()
+        self.offset_file = os.path.join(self.ASSISTANT_DIR, self.TELEGRAM_OFFSET_FILE)
+        self.load_offset()
+
+        # outgoing messages are queued and sent by a background sender,
+        # so the caller (voice path) never waits for a Telegram round-trip
+        self.outbox = Queue(maxsize=self.TELEGRAM_OUTBOX_SIZE)
+        self.send_rate = TokenBucket(self.TELEGRAM_SEND_RATE, self.TELEGRAM_SEND_BURST)
+        self.sender_thread = None
 
-    def get_url(self, url):
+    def get_url(self, url, timeout=None):
         try:
-            response = requests.get(url)
+            if timeout is None:
+                timeout = (self.TELEGRAM_CONNECT_TIMEOUT, self.TELEGRAM_READ_TIMEOUT)
+
+            # pooled keep-alive connections of the shared http client
+            response = http_get(url, timeout=timeout)
             return response.content.decode("utf8")
 
         except Exception as ex:
             raise Exception(f"Error while parsing URL. {str(ex)}")
 
-    def get_json_from_url(self, url):
+    def get_json_from_url(self, url, timeout=None):
         try:
-            content = self.get_url(url)
+            content = self.get_url(url, timeout)
             return json.loads(content)
 
         except Exception as ex:
@@ -32,10 +79,12 @@ class TelegramBot(Configuration):
 
     def get_updates(self, offset=None):
         try:
-            url = self.url + "getUpdates"
+            # long polling, Telegram holds the request until a message arrives or the poll timeout lapses
+            url = self.url + f"getUpdates?timeout={self.TELEGRAM_POLL_TIMEOUT}"
             if offset:
-                url += f"?offset={offset}"
-            return self.get_json_from_url(url)
+                url += f"&offset={offset}"
+            # wait a little longer than the poll timeout before giving up on the response
+            return self.get_json_from_url(url, (self.TELEGRAM_CONNECT_TIMEOUT, self.TELEGRAM_POLL_TIMEOUT + self.TELEGRAM_READ_TIMEOUT))
         except Exception as ex:
             raise Exception(f"Error while pulling updates. {str(ex)}")
 
@@ -48,14 +97,81 @@ class TelegramBot(Configuration):
         except Exception as ex:
             raise Exception(f"Error while pulling the last update id. {str(ex)}")
 
-    def get_last_chat_text(self, updates):
+    def set_webhook(self, webhook_url, secret_token=""):
         try:
-            num_updates = len(updates["result"])
-            last_update = num_updates - 1
-            return updates["result"][last_update]["message"]["text"]
+            url = self.url + f"setWebhook?url={urllib.parse.quote_plus(webhook_url)}&allowed_updates=%5B%22message%22%5D"
+            if secret_token:
+                url += f"&secret_token={urllib.parse.quote_plus(secret_token)}"
+
+            return self.get_json_from_url(url)
 
         except Exception as ex:
-            raise Exception(f"Error while pulling the last chat message. {str(ex)}")
+            raise Exception(f"Error while setting the webhook. {str(ex)}")
+
+    def delete_webhook(self):
+        try:
+            # switch back to getUpdates, Telegram refuses long polling while a webhook is set
+            return self.get_json_from_url(self.url + "deleteWebhook")
+
+        except Exception as ex:
+            raise Exception(f"Error while deleting the webhook. {str(ex)}")
+
+    def load_offset(self):
+        try:
+            if os.path.isfile(self.offset_file):
+                with open(self.offset_file, "r", encoding="utf-8") as fl:
+                    journal = json.load(fl)
+
+                self.last_update_id = journal.get("offset")
+                # re-queue the commands we received but did not handle before the restart
+                for update_id, command in sorted(journal.get("pending", [])):
+                    self.pending_commands[update_id] = command
+                    self.commands.put((update_id, command))
+                    self.last_update_id = max(self.last_update_id or 0, update_id + 1)
+
+        except Exception as ex:
+            raise Exception(f"Error while loading the update offset. {str(ex)}")
+
+    def save_offset(self):
+        try:
+            journal = {"offset": self.last_update_id, "pending": sorted([update_id, command] for update_id, command in self.pending_commands.items())}
+            # write to a temporary file first, so a crash never leaves a half written journal
+            temp_file = f"{self.offset_file}.tmp"
+            with open(temp_file, "w", encoding="utf-8") as fl:
+                json.dump(journal, fl)
+            os.replace(temp_file, self.offset_file)
+
+        except Exception as ex:
+            raise Exception(f"Error while saving the update offset. {str(ex)}")
+
+    def enqueue_update(self, update):
+        update_id = int(update["update_id"])
+        command = update.get("message", {}).get("text", "").strip()
+
+        with self.journal_lock:
+            if self.last_update_id and update_id < self.last_update_id:
+                # already received (or handled) before, don't replay it
+                return
+
+            self.last_update_id = update_id + 1
+
+            if command == "/start":
+                self.queue_message("Welcome to your personal Virtual Assistant on Telegram. Send some questions/commands to me and I'll try my best to respond.")
+
+            elif command:
+                self.pending_commands[update_id] = command.lower()
+                self.commands.put((update_id, command.lower()))
+
+            self.save_offset()
+
+    def next_command(self, timeout=None):
+        # block until the next command arrives, raises queue.Empty on timeout
+        return self.commands.get(timeout=timeout)
+
+    def command_done(self, update_id):
+        with self.journal_lock:
+            self.pending_commands.pop(update_id, None)
+            self.save_offset()
 
     def send_message(self, text, reply_markup=None):
         try:
@@ -65,30 +181,96 @@ class TelegramBot(Configuration):
             if reply_markup:
                 url += f"&reply_markup={reply_markup}"
 
-            self.get_url(url)
+            return self.get_json_from_url(url)
 
         except Exception as ex:
             raise Exception(f"Error while sending message. {str(ex)}")
 
+    def queue_message(self, text, reply_markup=None):
+        try:
+            self.outbox.put_nowait((text, reply_markup))
+
+        except Full:
+            # outbox is full (Telegram is unreachable or slow), drop the oldest message to keep the latest
+            try:
+                self.outbox.get_nowait()
+            except Empty:
+                pass
+            self.outbox.put_nowait((text, reply_markup))
+
+    def start_sender(self):
+        if self.sender_thread is None or not self.sender_thread.is_alive():
+            self.sender_thread = Thread(target=self._send_outbox)
+            self.sender_thread.setDaemon(True)
+            self.sender_thread.start()
+
+    def _next_batch(self, pending):
+        # wait for the first message, then give the burst a moment to arrive
+        text, reply_markup = pending.pop(0) if pending else self.outbox.get()
+        if reply_markup:
+            # messages with keyboard markup are sent on their own
+            return text, reply_markup
+
+        deadline = time.monotonic() + self.TELEGRAM_COALESCE_WINDOW
+        while True:
+            try:
+                next_text, next_markup = pending.pop(0) if pending else self.outbox.get(timeout=max(0, deadline - time.monotonic()))
+            except Empty:
+                break
+
+            merged = f"{text}\n{next_text}"
+            if next_markup or len(merged) > MAX_MESSAGE_LENGTH:
+                # can't merge this one, keep it for the next batch
+                pending.append((next_text, next_markup))
+                break
+
+            text = merged
+
+        return text[:MAX_MESSAGE_LENGTH], None
+
+    def _send_with_retry(self, text, reply_markup=None):
+        backoff = 1
+        for attempt in range(self.TELEGRAM_SEND_RETRIES):
+            # pace the messages according to Telegram's rate limit
+            self.send_rate.consume()
+
+            try:
+                response = self.send_message(text, reply_markup)
+                if response.get("ok"):
+                    return True
+
+                # respect the wait time Telegram asks for when we hit the rate limit (HTTP 429)
+                retry_after = response.get("parameters", {}).get("retry_after")
+                if not retry_after and response.get("error_code", 500) < 500:
+                    # the message itself is rejected, retrying will not help
+                    return False
+                time.sleep(retry_after or backoff)
+
+            except Exception:
+                time.sleep(backoff)
+
+            backoff = min(backoff * 2, 30)
+
+        return False
+
+    def _send_outbox(self):
+        pending = []
+        while True:
+            text, reply_markup = self._next_batch(pending)
+            self._send_with_retry(text, reply_markup)
+
     def poll(self):
         try:
-            # let continue this polling every half a second
+            # let's continue long polling, each request returns as soon as there's an update
             while True:
                 # let's pull the latest update in chat
                 updates = self.get_updates(self.last_update_id)
 
                 # if successul update and must have result count
                 if updates["ok"] and len(updates["result"]) > 0:
-                    # increment update_id based from the last update index
-                    self.last_update_id = self.get_last_update_id(updates) + 1
-
-                    command = self.get_last_chat_text(updates)
-                    if command == "/start":
-                        self.send_message("Welcome to your personal Virtual Assistant on Telegram. Send some questions/commands to me and I'll try my best to respond.")
-
-                    self.last_command = command.strip().lower()
-
-                time.sleep(0.5)
+                    # queue every update of the batch in order, not just the last one
+                    for update in sorted(updates["result"], key=lambda update: int(update["update_id"])):
+                        self.enqueue_update(update)
 
         except Exception:
             raise Exception(f"Error polling bot, trying to poll again...")
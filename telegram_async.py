@@ -0,0 +1,116 @@
+import asyncio
+import aiohttp
+from settings import Configuration
+from telegram import MAX_MESSAGE_LENGTH
+
+
+class AsyncTelegramBot(Configuration):
+
+    def __init__(self, url=None):
+        super().__init__()
+        # url can point to a local stand-in Bot API server (see fake_bot_api.py)
+        self.url = url if url else f"{self.TELEGRAM_URL}{self.TELEGRAM_TOKEN}/"
+        self.last_update_id = None
+        self.session = None
+        # one queue and worker per chat, so chats run concurrently but each chat stays in order
+        self.chat_queues = {}
+        self.chat_workers = {}
+
+    async def open(self):
+        if self.session is None or self.session.closed:
+            # pooled keep-alive connections shared by polling and sending
+            connector = aiohttp.TCPConnector(limit=self.TELEGRAM_ASYNC_CONNECTIONS)
+            self.session = aiohttp.ClientSession(connector=connector)
+
+    async def close(self):
+        for worker in self.chat_workers.values():
+            worker.cancel()
+        await asyncio.gather(*self.chat_workers.values(), return_exceptions=True)
+        self.chat_workers = {}
+        self.chat_queues = {}
+
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+    async def call(self, method, read_timeout=None, **params):
+        await self.open()
+
+        timeout = aiohttp.ClientTimeout(sock_connect=self.TELEGRAM_CONNECT_TIMEOUT, sock_read=(read_timeout or self.TELEGRAM_READ_TIMEOUT))
+        query = {key: str(value) for key, value in params.items() if value is not None}
+
+        async with self.session.get(self.url + method, params=query, timeout=timeout) as response:
+            return await response.json(content_type=None)
+
+    async def call_with_retry(self, method, read_timeout=None, **params):
+        backoff = 1
+        for attempt in range(self.TELEGRAM_SEND_RETRIES):
+            try:
+                response = await self.call(method, read_timeout, **params)
+                if response.get("ok"):
+                    return response
+
+                # respect the wait time Telegram asks for when we hit the rate limit (HTTP 429)
+                retry_after = response.get("parameters", {}).get("retry_after")
+                if not retry_after and response.get("error_code", 500) < 500:
+                    # the request itself is rejected, retrying will not help
+                    return response
+                await asyncio.sleep(retry_after or backoff)
+
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(backoff)
+
+            backoff = min(backoff * 2, 30)
+
+        raise Exception(f"Error while calling {method}, maximum retries already exhausted...")
+
+    async def get_updates(self, offset=None):
+        # long polling, wait a little longer than the poll timeout before giving up on the response
+        return await self.call("getUpdates", self.TELEGRAM_POLL_TIMEOUT + self.TELEGRAM_READ_TIMEOUT, offset=offset, timeout=self.TELEGRAM_POLL_TIMEOUT)
+
+    async def send_message(self, text, chat_id=None, reply_markup=None):
+        return await self.call_with_retry("sendMessage", text=text[:MAX_MESSAGE_LENGTH], chat_id=(chat_id or self.TELEGRAM_CHAT_ID), parse_mode="Markdown", reply_markup=reply_markup)
+
+    async def _chat_worker(self, queue, handler):
+        while True:
+            update = await queue.get()
+            try:
+                await handler(self, update)
+
+            except asyncio.CancelledError:
+                raise
+
+            except Exception as ex:
+                print(f"Error while handling bot update. {str(ex)}")
+
+    def dispatch(self, update, handler):
+        chat_id = update.get("message", {}).get("chat", {}).get("id")
+
+        if chat_id not in self.chat_queues:
+            self.chat_queues[chat_id] = asyncio.Queue()
+            self.chat_workers[chat_id] = asyncio.create_task(self._chat_worker(self.chat_queues[chat_id], handler))
+
+        self.chat_queues[chat_id].put_nowait(update)
+
+    async def poll(self, handler):
+        # handler is a coroutine function called as handler(bot, update)
+        backoff = 1
+        while True:
+            try:
+                updates = await self.get_updates(self.last_update_id)
+
+                if updates.get("ok"):
+                    backoff = 1
+                    for update in sorted(updates["result"], key=lambda update: int(update["update_id"])):
+                        self.last_update_id = int(update["update_id"]) + 1
+                        self.dispatch(update, handler)
+                else:
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+
+            except asyncio.CancelledError:
+                raise
+
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError):
+                # lost the connection, let's re-connect after a while
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30)
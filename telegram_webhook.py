@@ -0,0 +1,73 @@
+import hmac
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+
+
+class WebhookServer:
+
+    def __init__(self, bot, secret_token, host="127.0.0.1", port=8443, path="/telegram"):
+        # plain http, Telegram only delivers to https so it sits behind a TLS-terminating proxy.
+        # every update can run a bot command (restart, shutdown), the ones without our secret are refused
+        if not secret_token:
+            raise ValueError("The webhook server needs a secret token.")
+
+        self.bot = bot
+        self.path = path
+        self.secret_token = secret_token
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def port(self):
+        # actual port, when the server was created with port 0
+        return self.httpd.server_address[1]
+
+    def _make_handler(self):
+        server = self
+
+        class UpdateHandler(BaseHTTPRequestHandler):
+
+            def _reply(self, status):
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                if self.path != server.path:
+                    return self._reply(404)
+
+                # Telegram echoes the secret we registered with setWebhook on every request
+                secret_token = self.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+                if not hmac.compare_digest(secret_token.encode("utf8"), server.secret_token.encode("utf8")):
+                    return self._reply(403)
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    update = json.loads(self.rfile.read(length).decode("utf8"))
+                    # straight to the command queue, same path as polled updates
+                    server.bot.enqueue_update(update)
+
+                except (ValueError, KeyError):
+                    return self._reply(400)
+
+                except Exception:
+                    # let Telegram deliver the update again later
+                    return self._reply(500)
+
+                self._reply(200)
+
+            def log_message(self, format, *args):
+                # keep the console clean, every update would print an access log line
+                pass
+
+        return UpdateHandler
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
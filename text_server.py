@@ -0,0 +1,247 @@
+import hmac
+import json
+import time
+import requests
+from argparse import ArgumentParser
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread, Lock
+from session import Session, session_scope, current_session
+from metrics import collect_metrics
+
+
+class _ThreadingServer(ThreadingHTTPServer):
+    # many sessions connect at once, the default backlog of 5 makes them wait for a SYN retry
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class TextServer:
+
+    def __init__(self, respond, host="127.0.0.1", port=8765, session_timeout=1800, token=None):
+        # respond(text) answers the current session, e.g. VirtualAssistant.respond_to_text
+        self.respond = respond
+        # a session can run every skill (apps, volume, shutdown), so every request must carry the shared token
+        self.token = token
+        self.session_timeout = session_timeout
+        self.sessions = {}
+        self.sessions_lock = Lock()
+        self.metrics = {"requests": 0, "errors": 0, "unauthorized": 0}
+        # latency of the most recent requests, enough for the percentiles
+        self.latencies = deque(maxlen=10000)
+        self.metrics_lock = Lock()
+        self.httpd = _ThreadingServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def port(self):
+        # actual port, when the server was created with port 0
+        return self.httpd.server_address[1]
+
+    def get_session(self, session_id=None):
+        now = time.monotonic()
+
+        with self.sessions_lock:
+            # forget the sessions nobody talked to for a while
+            for expired_id in [sid for sid, session in self.sessions.items() if (now - session.last_seen) > self.session_timeout]:
+                del self.sessions[expired_id]
+
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = Session(session_id)
+                self.sessions[session.session_id] = session
+
+            session.last_seen = now
+            return session
+
+    def end_session(self, session):
+        with self.sessions_lock:
+            self.sessions.pop(session.session_id, None)
+
+    def handle_message(self, session_id, text):
+        session = self.get_session(session_id)
+
+        with session.lock:
+            with session_scope(session):
+                self.respond(text)
+            replies = session.take_replies()
+
+        if session.ended:
+            self.end_session(session)
+
+        return {"session_id": session.session_id, "replies": replies, "sleeping": session.sleeping, "ended": session.ended}
+
+    def authorized(self, token):
+        if not self.token:
+            return True
+
+        if token and hmac.compare_digest(token.encode("utf8"), self.token.encode("utf8")):
+            return True
+
+        with self.metrics_lock:
+            self.metrics["unauthorized"] += 1
+        return False
+
+    def _record(self, elapsed, failed=False):
+        with self.metrics_lock:
+            self.metrics["requests"] += 1
+            if failed:
+                self.metrics["errors"] += 1
+            self.latencies.append(elapsed)
+
+    def get_metrics(self):
+        with self.metrics_lock:
+            latencies = sorted(self.latencies)
+            metrics = dict(self.metrics)
+
+        with self.sessions_lock:
+            metrics["sessions"] = len(self.sessions)
+
+        if latencies:
+            metrics["latency_p50"] = latencies[len(latencies) // 2]
+            metrics["latency_p95"] = latencies[int(len(latencies) * .95)]
+            metrics["latency_max"] = latencies[-1]
+
+        # and the assistant's own (http hosts, budgets, pools, caches)
+        metrics["assistant"] = collect_metrics()
+        return metrics
+
+    def _make_handler(self):
+        server = self
+
+        class TextHandler(BaseHTTPRequestHandler):
+            # keep-alive, so a client doesn't pay a new connection per message
+            protocol_version = "HTTP/1.1"
+
+            def _reply(self, status, data=None):
+                body = json.dumps(data).encode("utf8") if data is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path != "/metrics":
+                    return self._reply(404)
+                if not server.authorized(self.headers.get("X-Token")):
+                    return self._reply(401)
+                self._reply(200, server.get_metrics())
+
+            def do_POST(self):
+                if self.path != "/message":
+                    return self._reply(404)
+                if not server.authorized(self.headers.get("X-Token")):
+                    # the body is never read, don't keep the connection for the next request
+                    self.close_connection = True
+                    return self._reply(401)
+
+                start_time = time.perf_counter()
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    message = json.loads(self.rfile.read(length).decode("utf8"))
+                    text = str(message["text"])
+
+                except (ValueError, KeyError, TypeError):
+                    return self._reply(400)
+
+                try:
+                    response = server.handle_message(message.get("session_id"), text)
+
+                except Exception as ex:
+                    server._record(time.perf_counter() - start_time, failed=True)
+                    return self._reply(500, {"error": str(ex)})
+
+                server._record(time.perf_counter() - start_time)
+                self._reply(200, response)
+
+            def log_message(self, format, *args):
+                # keep the console clean, every message would print an access log line
+                pass
+
+        return TextHandler
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def serve(host, port):
+    from assitant import VirtualAssistant
+
+    # no microphone, speaker or Telegram bot, only the routing and the skills (shared by every session)
+    assistant = VirtualAssistant(masters_name="Dave", assistants_name="Brenda", headless=True)
+    if not assistant.TEXT_SERVER_TOKEN:
+        print("Set TEXT_SERVER_TOKEN first, the text sessions can run every skill (apps, volume, shutdown).")
+        return
+
+    assistant.build_routes()
+    assistant.load_skills()
+
+    server = TextServer(assistant.respond_to_text, host, port, assistant.SESSION_TIMEOUT, assistant.TEXT_SERVER_TOKEN)
+    print(f"Text server is listening on http://{host}:{server.port}/message")
+    server.httpd.serve_forever()
+
+
+def serve_stub(host, port, token):
+    # the HTTP and session handling only, every message is answered by a 5 ms stub (no routing, no skills),
+    # a bench against it measures the server's overhead, not the assistant
+    def _respond(text):
+        time.sleep(.005)
+        current_session().reply(f"stub: {text}")
+
+    server = TextServer(_respond, host, port, token=token)
+    print(f"Stub text server (5 ms responder, no skills) is listening on http://{host}:{server.port}/message")
+    server.httpd.serve_forever()
+
+
+def bench(url, sessions, messages, text, token):
+    def _run_session(_):
+        latencies = []
+        session_id = None
+        # one connection per session, like a real client would do
+        with requests.Session() as client:
+            for _ in range(messages):
+                start_time = time.perf_counter()
+                response = client.post(f"{url}/message", json={"session_id": session_id, "text": text}, headers={"X-Token": token}, timeout=60)
+                latencies.append(time.perf_counter() - start_time)
+                response.raise_for_status()
+                session_id = response.json()["session_id"]
+        return latencies
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions) as pool:
+        latencies = sorted(latency for session_latencies in pool.map(_run_session, range(sessions)) for latency in session_latencies)
+    elapsed = time.perf_counter() - start_time
+
+    print(f"Server: {url} (against \"serve-stub\" these are the HTTP and session overhead only, not the assistant's skills)")
+    print(f"Sessions: {sessions}, Messages: {len(latencies)}, Text: \"{text}\"")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} requests/sec")
+    print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, p95: {latencies[int(len(latencies) * .95)] * 1000:.1f} ms, max: {latencies[-1] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Headless text server of the virtual assistant, and its load test.")
+    parser.add_argument("mode", choices=["serve", "serve-stub", "bench"],
+                        help="Run the server, run a stub server (5 ms responder, no skills, for benchmarking the HTTP and session handling only), or load test a running one.")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1", help="Address to listen on.")
+    parser.add_argument("--port", action="store", dest="port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument("--url", action="store", dest="url", default="http://127.0.0.1:8765", help="Server to load test.")
+    parser.add_argument("--sessions", action="store", dest="sessions", type=int, default=50, help="Number of concurrent sessions.")
+    parser.add_argument("--messages", action="store", dest="messages", type=int, default=20, help="Number of messages per session.")
+    parser.add_argument("--text", action="store", dest="text", default="what time is it", help="Message every session sends.")
+    parser.add_argument("--token", action="store", dest="token", default="", help="Shared token (TEXT_SERVER_TOKEN) sent by the load test, and required by the stub server if set.")
+
+    param = parser.parse_args()
+    if param.mode == "serve":
+        serve(param.host, param.port)
+    elif param.mode == "serve-stub":
+        serve_stub(param.host, param.port, param.token)
+    else:
+        bench(param.url, param.sessions, param.messages, param.text, param.token)
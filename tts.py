@@ -7,13 +7,19 @@ import colorama
 import linecache
 import logging
 import time
+import hashlib
 from helper import is_match, is_match_and_bare, check_connection
 from gtts import gTTS
 from gtts.tts import gTTSError
 from settings import Configuration
 from skills_library import SkillsLibrary
 from telegram import TelegramBot
-from threading import Thread
+from telegram_webhook import WebhookServer
+from event_bus import EventBus, BotCommand, Restart
+from lifecycle import WarmState
+from session import current_session
+from threading import Thread, Event
+from queue import Empty
 from datetime import datetime as dt
 
 # logging.basicConfig(filename="VirtualAssistant.log", filemode="a", level=logging.ERROR, format="%(asctime)s | %(levelname)s | %(message)s", datefmt='%m-%d-%Y %I:%M:%S %p')
@@ -30,7 +36,7 @@ logger.addHandler(file_handler)
 
 class SpeechAssistant(Configuration):
 
-    def __init__(self, masters_name, assistants_name):
+    def __init__(self, masters_name, assistants_name, warm=None, headless=False):
         super().__init__()
         self.master_name = masters_name
         self.assistant_name = assistants_name
@@ -44,10 +50,29 @@ class SpeechAssistant(Configuration):
 
         self.skill = SkillsLibrary(self, self.master_name, self.assistant_name)
         self.speaker = None
-        self.restart_request = False
+        self.restart_reason = None
         self.bot = None
-        self.bot_command = None
-        self.init_bot()
+        self.webhook = None
+        self.bot_command_thread = None
+        # stops this instance's command handler only, the queue is shared with the next instance
+        self.bot_command_stop = Event()
+        # text -> audio file synthesized ahead of time (morning briefing), played without waiting for google
+        self.prepared_speech = {}
+        # components kept alive by the supervisor across in-process restarts
+        self.warm = warm if warm else WarmState()
+        if self.warm.events is None:
+            # threads coordinate through events instead of polling shared flags
+            self.warm.events = EventBus()
+            self.warm.bot_commands = self.warm.events.subscribe(BotCommand)
+        self.events = self.warm.events
+        # restart requests (bot command, scheduled re-authentication, errors), taken by the listen loop
+        self.restart_requests = self.events.subscribe(Restart)
+        # the bot commands not yet taken by the listen loop survive a restart
+        self.bot_commands = self.warm.bot_commands
+        # headless (text server), no microphone, speaker or Telegram bot
+        self.headless = headless
+        if not self.headless:
+            self.init_bot()
 
     def Log(self, exception_title="", ex_type=logging.ERROR):
         log_data = ""
@@ -89,7 +114,14 @@ class SpeechAssistant(Configuration):
             logger.critical(log_data)
 
     def listen_to_audio(self, ask=None):
+        if current_session():
+            # a text session can't be asked a follow-up question in the middle of a request
+            if ask:
+                self.speak(ask)
+            return ""
+
         voice_text = ""
+        from_bot = False
         listen_timeout = 3
         phrase_limit = 10
 
@@ -108,8 +140,15 @@ class SpeechAssistant(Configuration):
                 if ask:
                     self.speak(ask)
 
-                if self.bot_command and "/" not in self.bot_command:
-                    voice_text = self.bot_command
+                # commands from bot are taken in order, one per listen
+                bot_command = self.bot_commands.get_nowait()
+                if bot_command:
+                    from_bot = True
+                    voice_text = bot_command.command
+                    self.bot.command_done(bot_command.update_id)
+                    # let's use a wakeup command if she's sleeping.
+                    if self.isSleeping():
+                        voice_text = f"hey {self.assistant_name} {voice_text}"
 
                 else:
                     # listening
@@ -156,45 +195,117 @@ class SpeechAssistant(Configuration):
             print(
                 f"{self.BLACK_GREEN}{self.master_name}:{self.GREEN} {voice_text}")
 
-        if not self.isSleeping() and not self.bot_command and voice_text.strip():
+        if not self.isSleeping() and not from_bot and voice_text.strip():
             self.respond_to_bot(f"(I heared) YOU: \"{voice_text}\"")
 
-        if voice_text.strip():
-            self.bot.last_command = None
-
         return voice_text.strip()
 
     def sleep(self, value):
+        session = current_session()
+        if session:
+            session.sleeping = value
+            return
+
         self.sleep_assistant = value
 
+    def request_restart(self, reason=""):
+        self.events.publish(Restart(reason))
+
+    def restart_requested(self):
+        # take the restart requests published so far, the first one wins
+        event = self.restart_requests.get_nowait()
+        while event:
+            if self.restart_reason is None:
+                self.restart_reason = event.reason
+            event = self.restart_requests.get_nowait()
+
+        return self.restart_reason is not None
+
     def isSleeping(self):
-        return self.sleep_assistant
+        session = current_session()
+        return session.sleeping if session else self.sleep_assistant
 
     def init_bot(self):
-        try:
-            self.bot = TelegramBot()
-            self.bot_command = None
-
-            if check_connection():
-                poll_thread = Thread(target=self.poll_bot)
-                poll_thread.setDaemon(True)
-                poll_thread.start()
-
-                bot_command_thread = Thread(target=self.handle_bot_commands)
-                bot_command_thread.setDaemon(True)
-                bot_command_thread.start()
-
-        except Exception:
-            self.Log("Error while initiating telegram bot.")
-            time.sleep(5)
-            self.restart_request = True
-            self.init_bot()
+        if self.warm.bot:
+            # warm restart, the bot, its sender and poll/webhook threads are still running,
+            # only the command handler is bound to the previous instance
+            self.bot = self.warm.bot
+            self.webhook = self.warm.webhook
+            self.start_bot_command_handler()
+            return
+
+        if self.TELEGRAM_WEBHOOK_URL and not self.TELEGRAM_WEBHOOK_SECRET:
+            # anyone who finds the port could send bot commands, a restart won't fix the settings
+            self.Log("Set TELEGRAM_WEBHOOK_SECRET to use the telegram webhook, the bot is not started.")
+            return
+
+        for attempt in range(1, self.TELEGRAM_INIT_ATTEMPTS + 1):
+            try:
+                if self.bot is None:
+                    self.bot = TelegramBot()
+                # background sender for the messages queued by respond_to_bot()
+                self.bot.start_sender()
+
+                if check_connection():
+                    if self.TELEGRAM_WEBHOOK_URL:
+                        # webhook mode, Telegram pushes the updates to our built-in http server (listening before Telegram knows about it)
+                        self.webhook = WebhookServer(self.bot, self.TELEGRAM_WEBHOOK_SECRET, self.TELEGRAM_WEBHOOK_HOST, self.TELEGRAM_WEBHOOK_PORT, self.TELEGRAM_WEBHOOK_PATH)
+                        self.webhook.start()
+                        response = self.bot.set_webhook(self.TELEGRAM_WEBHOOK_URL, self.TELEGRAM_WEBHOOK_SECRET)
+                        if not response.get("ok"):
+                            raise Exception(f"Telegram refused the webhook. {response.get('description', '')}")
+
+                    else:
+                        self.bot.delete_webhook()
+                        poll_thread = Thread(target=self.poll_bot)
+                        poll_thread.setDaemon(True)
+                        poll_thread.start()
+
+                    self.warm.bot = self.bot
+                    self.warm.webhook = self.webhook
+                    self.start_bot_command_handler()
+                return
+
+            except Exception:
+                self.Log(f"Error while initiating telegram bot (attempt {attempt} of {self.TELEGRAM_INIT_ATTEMPTS}).")
+                if self.webhook:
+                    # free the port for the next attempt
+                    self.webhook.stop()
+                    self.webhook = None
+                time.sleep(5)
+
+        # no bot this time, the next instance tries again
+        self.request_restart("Error while initiating telegram bot.")
+
+    def start_bot_command_handler(self):
+        self.bot_command_thread = Thread(target=self.handle_bot_commands)
+        self.bot_command_thread.setDaemon(True)
+        self.bot_command_thread.start()
+
+    def shutdown(self):
+        # stop the threads bound to this instance, the warm components are left running
+        self.restart_requests.close()
+        if self.bot_command_thread and self.bot_command_thread.is_alive():
+            # nothing is put on the shared queue, the next instance's handler would take it
+            self.bot_command_stop.set()
+            self.bot_command_thread.join(timeout=5)
 
     def respond_to_bot(self, audio_string):
         # don't send response to bot with audio_string containing "filler" p hrases.
         if not is_match(audio_string, ["I'm here...", "I'm listening...", "(in mute)", "listening..."]):
             audio_string = audio_string.replace(f"{self.assistant_name}:", "")
-            self.bot.send_message(audio_string)
+
+            session = current_session()
+            if session:
+                # text sessions get the response, not the Telegram chat
+                session.reply(audio_string)
+                return
+
+            if not self.bot:
+                return
+
+            # queue the message, the bot's sender thread delivers it in the background
+            self.bot.queue_message(audio_string)
 
     def poll_bot(self):
         while True:
@@ -206,75 +317,127 @@ class SpeechAssistant(Configuration):
                 time.sleep(5)
                 continue
 
+    def on_bot_command(self, command):
+        # override to handle a bot command directly, instead of passing it to the listen loop
+        return False
+
     def handle_bot_commands(self):
-        while True:
+        # until shutdown() of this instance, a new handler takes over after restart
+        while not self.bot_command_stop.is_set():
             try:
-                # get the latest command from bot
-                self.bot_command = self.bot.last_command
+                # wait for the next command from bot, and check for shutdown every second
+                try:
+                    update_id, command = self.bot.next_command(timeout=1)
+                except Empty:
+                    continue
 
                 # handles the RESTAR command sequece of virtual assistant application
-                if self.bot_command and "/restart" in self.bot_command:
-                    self.bot_command = f"restart {self.assistant_name}"
+                if "/restart" in command:
+                    self.bot.command_done(update_id)
                     # lower the volume of music player (if it's currently playing)
                     # so listening microphone will not block our bot_command request
                     self.skill.music_volume(30)
-                    # set the restart flag to true
-                    self.restart_request = True
-                    break
+                    self.request_restart("Restart requested from bot.")
+                    continue
 
-                elif self.bot_command:
-                    # lower the volume of music player (if it's currently playing)
-                    # so listening microphone will not block our bot_command request
-                    self.skill.music_volume(30)
-                    # let's use a wakeup command if she's sleeping.
-                    if self.isSleeping():
-                        self.bot_command = f"hey {self.assistant_name} {self.bot_command}"
+                # commands handled right away (settings), and the bot commands we don't know
+                if self.on_bot_command(command) or "/" in command:
+                    self.bot.command_done(update_id)
+                    continue
 
-                time.sleep(0.5)
+                # lower the volume of music player (if it's currently playing)
+                # so listening microphone will not block our bot_command request
+                self.skill.music_volume(30)
+                # hand over the command to the listen loop, it's marked done once taken
+                self.events.publish(BotCommand(update_id, command))
 
             except Exception:
                 self.Log("Error while handling bot commands.")
-                self.restart_request = True
+                self.request_restart("Error while handling bot commands.")
                 time.sleep(5)
                 continue
 
+    def prepare_speech(self, texts):
+        # synthesize the texts we're about to say, and forget the ones we prepared before
+        prepared_folder = os.path.join(self.ASSISTANT_DIR, self.AUDIO_FOLDER, "prepared")
+        if not os.path.isdir(prepared_folder):
+            os.makedirs(prepared_folder)
+
+        prepared_speech = {}
+        for text in texts:
+            if not text.strip() or text in prepared_speech:
+                continue
+
+            # same text, same file, so an unchanged section isn't synthesized again
+            audio_file = os.path.join(prepared_folder, f"{hashlib.sha1(text.encode('utf8')).hexdigest()}.mp3")
+            try:
+                if not os.path.isfile(audio_file):
+                    gTTS(text=text, lang="en-us", slow=False).save(audio_file)
+                prepared_speech[text] = audio_file
+
+            except Exception:
+                self.Log("Exception occurred while preparing speech.", logging.WARNING)
+
+        old_files = set(self.prepared_speech.values()) - set(prepared_speech.values())
+        self.prepared_speech = prepared_speech
+
+        for audio_file in old_files:
+            try:
+                os.remove(audio_file)
+            except OSError:
+                # still playing, it goes with the next cleanup
+                pass
+
     def speak(self, audio_string, start_prompt=False, end_prompt=False, mute_prompt=False):
+        session = current_session()
+        if session:
+            # no audio for text sessions, just the text (and no sound effects)
+            if not (end_prompt or mute_prompt or "<start prompt>" in audio_string):
+                self.respond_to_bot(audio_string)
+            return
+
         if audio_string.strip():
             try:
                 # volume up the music player, if applicable
                 self.skill.music_volume(30)
                 force_delete = False
+                keep_file = False
                 # init google's text-to-speech module
                 tts = gTTS(text=audio_string, lang="en-us", slow=False)
 
-                # make sure we're in the correct directory of batch file to execute
-                os.chdir(self.ASSISTANT_DIR)
-
-                if not os.path.isdir(self.AUDIO_FOLDER):
-                    os.mkdir(self.AUDIO_FOLDER)
+                # absolute paths, the current directory may belong to another skill
+                audio_folder = os.path.join(self.ASSISTANT_DIR, self.AUDIO_FOLDER)
+                if not os.path.isdir(audio_folder):
+                    os.mkdir(audio_folder)
 
                 # generate a filename for the audio file generated by google
-                audio_file = f"{self.AUDIO_FOLDER}/assistants-audio-{str(random.randint(1, 1000))}.mp3"
+                audio_file = os.path.join(audio_folder, f"assistants-audio-{str(random.randint(1, 1000))}.mp3")
 
                 if start_prompt and "<start prompt>" in audio_string:
-                    audio_file = f"{self.AUDIO_FOLDER}/start prompt.mp3"
+                    audio_file = os.path.join(audio_folder, "start prompt.mp3")
 
                 elif start_prompt and audio_string:
                     tts.save(audio_file)
-                    sound.playsound(f"{self.AUDIO_FOLDER}/start prompt.mp3")
+                    sound.playsound(os.path.join(audio_folder, "start prompt.mp3"))
                     print(f"{self.BLACK_CYAN}{self.assistant_name}:{self.CYAN} {audio_string}")
                     # respond to bot as well
                     self.respond_to_bot(audio_string)
                     force_delete = True
 
                 elif end_prompt:
-                    audio_file = f"{self.AUDIO_FOLDER}/end prompt.mp3"
+                    audio_file = os.path.join(audio_folder, "end prompt.mp3")
 
                 elif mute_prompt:
-                    audio_file = f"{self.AUDIO_FOLDER}/mute prompt.mp3"
+                    audio_file = os.path.join(audio_folder, "mute prompt.mp3")
 
                 else:
-                    tts.save(audio_file)
+                    prepared_file = self.prepared_speech.get(audio_string)
+                    if prepared_file and os.path.isfile(prepared_file):
+                        # synthesized ahead of time, keep it for the next time it's said
+                        audio_file = prepared_file
+                        keep_file = True
+                    else:
+                        tts.save(audio_file)
                     print(f"{self.BLACK_CYAN}{self.assistant_name}:{self.CYAN} {audio_string}")
                     # respond to bot as well
                     self.respond_to_bot(audio_string)
@@ -282,7 +445,7 @@ class SpeechAssistant(Configuration):
                 # announce/play the generated audio
                 sound.playsound(audio_file)
 
-                if not start_prompt and not end_prompt and not mute_prompt or force_delete:
+                if (not start_prompt and not end_prompt and not mute_prompt or force_delete) and not keep_file:
                     # delete the audio file after announcing to save mem space
                     os.remove(audio_file)
 
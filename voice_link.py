@@ -0,0 +1,340 @@
+import io
+import os
+import hmac
+import json
+import time
+import socket
+import struct
+import tempfile
+import socketserver
+from argparse import ArgumentParser
+from threading import Thread
+from session import Session, session_scope
+
+# every frame: header length and payload length (4 bytes each, big-endian), the json header, then the raw payload
+FRAME_PREFIX = struct.Struct(">II")
+MAX_HEADER_SIZE = 64 * 1024
+MAX_PAYLOAD_SIZE = 16 * 1024 * 1024
+
+# front-end -> back-end
+HELLO = "hello"              # {"room": name, "token": shared token}, the first frame
+TRANSCRIPT = "transcript"    # {"text": what was said}
+AUDIO = "audio"              # {"sample_rate", "sample_width"} + raw PCM payload
+# back-end -> front-end
+REPLY = "reply"              # {"text"} + synthesized mp3 payload (empty when synthesis is off)
+DONE = "done"                # {"sleeping", "ended"}, end of the replies to one request
+ERROR = "error"              # {"message"}
+
+
+class FrameError(ConnectionError):
+    # the peer broke the framing, the rest of the stream can't be trusted
+    pass
+
+
+def send_frame(sock, header, payload=b""):
+    header = json.dumps(header).encode("utf8")
+    # one sendall per frame, so frames from different threads never interleave mid-frame on the wire
+    sock.sendall(FRAME_PREFIX.pack(len(header), len(payload)) + header + payload)
+
+
+def _recv_exactly(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(min(size - len(data), 65536))
+        if not chunk:
+            raise ConnectionError("Connection closed in the middle of a frame.")
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_frame(sock):
+    prefix = sock.recv(FRAME_PREFIX.size)
+    if not prefix:
+        # clean close between frames
+        return None, None
+    prefix += _recv_exactly(sock, FRAME_PREFIX.size - len(prefix))
+
+    header_size, payload_size = FRAME_PREFIX.unpack(prefix)
+    if header_size > MAX_HEADER_SIZE or payload_size > MAX_PAYLOAD_SIZE:
+        raise FrameError(f"Frame is too large ({header_size} + {payload_size} bytes).")
+
+    header = json.loads(_recv_exactly(sock, header_size).decode("utf8"))
+    payload = _recv_exactly(sock, payload_size) if payload_size else b""
+    return header, payload
+
+
+def synthesize_mp3(text):
+    from gtts import gTTS
+
+    # straight to memory, no audio file on the back-end's disk
+    audio = io.BytesIO()
+    gTTS(text=text, lang="en-us", slow=False).write_to_fp(audio)
+    return audio.getvalue()
+
+
+def transcribe(payload, sample_rate, sample_width):
+    import speech_recognition as sr
+
+    return sr.Recognizer().recognize_google(sr.AudioData(payload, sample_rate, sample_width))
+
+
+class _ThreadingServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class VoiceBackend:
+
+    def __init__(self, respond, host="127.0.0.1", port=8766, synthesize=None, transcribe=transcribe, token=None):
+        # respond(text) answers the current session (VirtualAssistant.respond_to_text),
+        # synthesize(text) returns the audio sent back with every reply (None for text only)
+        self.respond = respond
+        # a session can run every skill (apps, volume, shutdown), so a front-end must say hello with the shared token
+        self.token = token
+        self.synthesize = synthesize
+        self.transcribe = transcribe
+        self.server = _ThreadingServer((host, port), self._make_handler())
+        self.thread = None
+
+    @property
+    def port(self):
+        # actual port, when the server was created with port 0
+        return self.server.server_address[1]
+
+    def authorized(self, token):
+        if not self.token:
+            return True
+        return bool(token) and hmac.compare_digest(str(token).encode("utf8"), self.token.encode("utf8"))
+
+    def _answer(self, sock, session, text):
+        with session_scope(session):
+            self.respond(text)
+
+        for reply in session.take_replies():
+            audio = b""
+            if self.synthesize:
+                try:
+                    audio = self.synthesize(reply)
+                except Exception:
+                    # the front-end still gets the text
+                    audio = b""
+            send_frame(sock, {"type": REPLY, "text": reply}, audio)
+
+        send_frame(sock, {"type": DONE, "sleeping": session.sleeping, "ended": session.ended})
+
+    def _make_handler(self):
+        backend = self
+
+        class FrontendHandler(socketserver.BaseRequestHandler):
+
+            def handle(self):
+                sock = self.request
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                # one session per front-end (room), so each room has its own sleep state
+                session = Session()
+                authenticated = False
+
+                while not session.ended:
+                    try:
+                        header, payload = recv_frame(sock)
+                        if header is None:
+                            break
+
+                        kind = header.get("type")
+                        if not authenticated:
+                            if kind != HELLO or not backend.authorized(header.get("token")):
+                                send_frame(sock, {"type": ERROR, "message": "Unauthorized."})
+                                break
+                            authenticated = True
+
+                        if kind == HELLO:
+                            session.room = header.get("room", "")
+
+                        elif kind == TRANSCRIPT:
+                            backend._answer(sock, session, header.get("text", ""))
+
+                        elif kind == AUDIO:
+                            text = backend.transcribe(payload, header["sample_rate"], header["sample_width"])
+                            backend._answer(sock, session, text)
+
+                        else:
+                            send_frame(sock, {"type": ERROR, "message": f"Unknown frame type \"{kind}\"."})
+
+                    except (ConnectionError, OSError):
+                        break
+
+                    except Exception as ex:
+                        # bad frame or failed request, the connection itself is still fine
+                        try:
+                            send_frame(sock, {"type": ERROR, "message": str(ex)})
+                        except OSError:
+                            break
+
+        return FrontendHandler
+
+    def start(self):
+        self.thread = Thread(target=self.server.serve_forever)
+        self.thread.setDaemon(True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class VoiceFrontend:
+
+    def __init__(self, host="127.0.0.1", port=8766, room="", token=""):
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_frame(self.sock, {"type": HELLO, "room": room, "token": token})
+        self.sleeping = False
+        self.ended = False
+
+    def _replies(self):
+        # [(text, mp3 audio)], up to the DONE frame
+        replies = []
+        while True:
+            header, payload = recv_frame(self.sock)
+            if header is None:
+                raise ConnectionError("Back-end closed the connection.")
+
+            if header["type"] == REPLY:
+                replies.append((header["text"], payload))
+            elif header["type"] == DONE:
+                self.sleeping = header["sleeping"]
+                self.ended = header["ended"]
+                return replies
+            elif header["type"] == ERROR:
+                raise RuntimeError(header["message"])
+
+    def send_transcript(self, text):
+        send_frame(self.sock, {"type": TRANSCRIPT, "text": text})
+        return self._replies()
+
+    def send_audio(self, audio_data):
+        # speech_recognition.AudioData from the microphone, recognized on the back-end
+        send_frame(self.sock, {"type": AUDIO, "sample_rate": audio_data.sample_rate, "sample_width": audio_data.sample_width}, audio_data.get_raw_data())
+        return self._replies()
+
+    def close(self):
+        self.sock.close()
+
+
+def serve(host, port):
+    from assitant import VirtualAssistant
+
+    # no microphone or speaker here, the front-ends have them
+    assistant = VirtualAssistant(masters_name="Dave", assistants_name="Brenda", headless=True)
+    if not assistant.VOICE_LINK_TOKEN:
+        print("Set VOICE_LINK_TOKEN first, the front-ends can run every skill (apps, volume, shutdown).")
+        return
+
+    assistant.build_routes()
+    assistant.load_skills()
+
+    backend = VoiceBackend(assistant.respond_to_text, host, port, synthesize=synthesize_mp3, token=assistant.VOICE_LINK_TOKEN)
+    print(f"Voice back-end is listening on {host}:{backend.port}")
+    backend.server.serve_forever()
+
+
+def run_frontend(host, port, room, token):
+    import playsound as sound
+    import speech_recognition as sr
+
+    frontend = VoiceFrontend(host, port, room, token)
+    recognizer = sr.Recognizer()
+
+    with sr.Microphone() as source:
+        while not frontend.ended:
+            try:
+                recognizer.adjust_for_ambient_noise(source, duration=0.5)
+                audio = recognizer.listen(source, timeout=3, phrase_time_limit=10)
+
+                for text, mp3 in frontend.send_audio(audio):
+                    print(text)
+                    if mp3:
+                        audio_file = os.path.join(tempfile.gettempdir(), f"voice-link-{room}.mp3")
+                        with open(audio_file, "wb") as fl:
+                            fl.write(mp3)
+                        sound.playsound(audio_file)
+                        os.remove(audio_file)
+
+            except sr.WaitTimeoutError:
+                continue
+
+            except RuntimeError as ex:
+                # nothing recognized, or the request failed on the back-end
+                print(f"({ex})")
+
+    frontend.close()
+
+
+def self_test(rooms, messages):
+    # back-end with a stand-in assistant, and a few front-ends (rooms) on localhost
+    from session import current_session
+
+    def _respond(text):
+        session = current_session()
+        if text == "sleep":
+            session.sleeping = True
+        session.reply(f"you said {text}")
+
+    backend = VoiceBackend(_respond, port=0, synthesize=(lambda text: text.encode("utf8")), token="self-test")
+    backend.start()
+    latencies = []
+
+    # a front-end without the token is turned away before anything is answered
+    intruder = VoiceFrontend(port=backend.port, room="intruder", token="wrong")
+    try:
+        intruder.send_transcript("shutdown")
+        raise AssertionError("A front-end with the wrong token was answered.")
+    except RuntimeError as ex:
+        assert str(ex) == "Unauthorized.", ex
+    intruder.close()
+
+    def _room(name):
+        frontend = VoiceFrontend(port=backend.port, room=name, token="self-test")
+        for count in range(messages):
+            start_time = time.perf_counter()
+            replies = frontend.send_transcript(f"{name} {count}")
+            latencies.append(time.perf_counter() - start_time)
+            assert replies == [(f"you said {name} {count}", f"you said {name} {count}".encode("utf8"))], replies
+
+        frontend.send_transcript("sleep")
+        assert frontend.sleeping
+        frontend.close()
+
+    start_time = time.perf_counter()
+    threads = [Thread(target=_room, args=(f"room{room}",)) for room in range(rooms)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+    backend.stop()
+
+    latencies.sort()
+    print(f"Rooms: {rooms}, Messages: {len(latencies)}, all replies matched, wrong token refused")
+    print(f"Throughput: {len(latencies) / elapsed:.1f} requests/sec")
+    print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.2f} ms, p95: {latencies[int(len(latencies) * .95)] * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Audio front-end and assistant back-end over a framed socket protocol.")
+    parser.add_argument("mode", choices=["serve", "frontend", "selftest"], help="Run the back-end, a microphone front-end, or a localhost self test.")
+    parser.add_argument("--host", action="store", dest="host", default="127.0.0.1", help="Back-end address.")
+    parser.add_argument("--port", action="store", dest="port", type=int, default=8766, help="Back-end port.")
+    parser.add_argument("--room", action="store", dest="room", default="", help="Name of this front-end.")
+    parser.add_argument("--token", action="store", dest="token", default="", help="Shared token (VOICE_LINK_TOKEN) the front-end says hello with.")
+    parser.add_argument("--rooms", action="store", dest="rooms", type=int, default=8, help="Self test, number of front-ends.")
+    parser.add_argument("--messages", action="store", dest="messages", type=int, default=200, help="Self test, messages per front-end.")
+
+    param = parser.parse_args()
+    if param.mode == "serve":
+        serve(param.host, param.port)
+    elif param.mode == "frontend":
+        run_frontend(param.host, param.port, param.room, param.token)
+    else:
+        self_test(param.rooms, param.messages)